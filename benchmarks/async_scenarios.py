@@ -0,0 +1,74 @@
+"""asyncio variants of the benchmark scenarios (Python 3.6+, aiohttp)."""
+import asyncio
+import timeit
+
+from yandex_money.aio import (AsyncWallet, AsyncExternalPayment, AiohttpTransport,
+                              AsyncRetryTransport)
+from yandex_money.retry import RetryPolicy
+
+timer = timeit.default_timer
+
+
+def bind(cls, url):
+    return type(cls.__name__, (cls,), {'MONEY_URL': url, 'SP_MONEY_URL': url})
+
+
+async def account_info(wallet, external):
+    (await wallet.account_info()).balance_details.total
+
+
+async def wallet_payment(wallet, external):
+    request = await wallet.request_payment({'pattern_id': 'p2p', 'to': '410011161616877',
+                                            'amount_due': '1.00'})
+    await wallet.process_payment({'request_id': request.request_id})
+
+
+async def operation_history(wallet, external):
+    async for operation in wallet.iter_operation_history({'records': 100}):
+        operation['operation_id']
+
+
+async def external_payment(wallet, external):
+    request = await external.request({'pattern_id': 'p2p', 'to': '410011161616877',
+                                      'amount': '1.00'})
+    await external.process({'request_id': request.request_id,
+                            'ext_auth_success_uri': 'http://localhost/ok',
+                            'ext_auth_fail_uri': 'http://localhost/fail'})
+
+
+SCENARIOS = {
+    'account_info': account_info,
+    'wallet_payment': wallet_payment,
+    'operation_history': operation_history,
+    'external_payment': external_payment,
+}
+
+
+async def _run(name, url, calls, concurrency):
+    scenario = SCENARIOS[name]
+    async with AiohttpTransport(limit=concurrency) as base:
+        transport = AsyncRetryTransport(base, RetryPolicy(jitter=False))
+        wallet = bind(AsyncWallet, url)('token', transport=transport)
+        external = bind(AsyncExternalPayment, url)('client', transport=transport)
+        await scenario(wallet, external)
+
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                call_started = timer()
+                await scenario(wallet, external)
+                latencies.append(timer() - call_started)
+
+        started = timer()
+        await asyncio.gather(*[timed() for _ in range(calls)])
+        return latencies, timer() - started
+
+
+def run(name, url, calls, concurrency):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_run(name, url, calls, concurrency))
+    finally:
+        loop.close()
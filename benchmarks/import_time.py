@@ -0,0 +1,79 @@
+"""Cold-start cost of the SDK.
+
+    python -m benchmarks.import_time [--runs 20] [--budget-ms 30]
+
+Every run imports yandex_money.api in a fresh interpreter and builds an
+OAuth URL, the typical work of a short-lived worker. Fails (exit status 1)
+when the median import time exceeds the budget or when networking modules
+were loaded although nothing was sent.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# modules that must only be imported on first network use
+LAZY_MODULES = ('requests', 'urllib3', 'sqlite3', 'hashlib', 'tempfile', 'json')
+
+CHILD = '''
+import sys
+import timeit
+before = set(sys.modules)  # e.g. .pth files may load some of them already
+started = timeit.default_timer()
+from yandex_money.api import Wallet
+elapsed = timeit.default_timer() - started
+Wallet.build_obtain_token_url('client', 'https://example.com/', ['account-info'])
+loaded = sorted(name for name in %r if name in sys.modules and name not in before)
+import json
+print(json.dumps({'import_ms': elapsed * 1000, 'loaded': loaded}))
+'''
+
+
+def measure_once():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    output = subprocess.check_output([sys.executable, '-c', CHILD % (LAZY_MODULES,)],
+                                     env=env)
+    return json.loads(output.decode('utf-8'))
+
+
+def run(runs):
+    samples = [measure_once() for _ in range(runs)]
+    times = sorted(sample['import_ms'] for sample in samples)
+    loaded = sorted(set(name for sample in samples for name in sample['loaded']))
+    return {'runs': runs,
+            'median_ms': times[len(times) // 2],
+            'min_ms': times[0],
+            'max_ms': times[-1],
+            'loaded': loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=30.0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    result = run(args.runs)
+    result['budget_ms'] = args.budget_ms
+    result['ok'] = result['median_ms'] <= args.budget_ms and not result['loaded']
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print('import yandex_money.api: median {median_ms:.1f} ms, min {min_ms:.1f} ms, '
+              'max {max_ms:.1f} ms over {runs} runs (budget {budget_ms:.0f} ms)'
+              .format(**result))
+        if result['loaded']:
+            print('loaded eagerly: ' + ', '.join(result['loaded']))
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main()['ok'] else 1)
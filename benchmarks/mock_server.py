@@ -0,0 +1,205 @@
+"""Local stand-in for the Yandex.Money HTTP API used by the benchmarks.
+
+Run standalone with ``python -m benchmarks.mock_server [port]``.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import itertools
+import json
+import sys
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qsl
+
+
+class MockState(object):
+    def __init__(self, operations=1000, page_size=30, in_progress_polls=1,
+                 next_retry=1):
+        self.operations = operations
+        self.page_size = page_size
+        self.in_progress_polls = in_progress_polls
+        self.next_retry = next_retry
+        self.polls = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def new_id(self):
+        with self.lock:
+            return str(next(self.ids))
+
+    def poll(self, request_id):
+        with self.lock:
+            count = self.polls.get(request_id, 0) + 1
+            self.polls[request_id] = count
+        return count <= self.in_progress_polls
+
+
+def account_info(state, params):
+    return {'account': '4100175017397', 'balance': 1000.45, 'currency': '643',
+            'account_status': 'anonymous', 'account_type': 'personal',
+            'balance_details': {'total': 1000.45, 'available': 1000.45},
+            'cards_linked': [{'pan_fragment': '510000******9999', 'type': 'MasterCard'}]}
+
+
+def operation_history(state, params):
+    start = int(params.get('start_record', 0))
+    records = min(int(params.get('records', state.page_size)), 100)
+    end = min(start + records, state.operations)
+    body = {'operations': [{
+        'operation_id': str(1000000 + i),
+        'status': 'success',
+        'datetime': '2014-04-08T12:34:{:02d}Z'.format(i % 60),
+        'title': 'Payment #{}'.format(i),
+        'pattern_id': 'p2p',
+        'direction': 'in' if i % 2 else 'out',
+        'amount': '{}.00'.format(i % 1000),
+        'label': 'label-{}'.format(i % 10),
+        'type': 'deposition' if i % 2 else 'payment-shop',
+    } for i in range(start, end)]}
+    if end < state.operations:
+        body['next_record'] = str(end)
+    return body
+
+
+def request_payment(state, params):
+    if params.get('to') == 'unknown':
+        return {'status': 'refused', 'error': 'payee_not_found'}
+    return {'status': 'success', 'request_id': state.new_id(),
+            'contract_amount': params.get('amount_due') or params.get('amount', '1.00'),
+            'balance': 1000.45, 'money_source': {'wallet': {'allowed': True}}}
+
+
+def process_payment(state, params):
+    request_id = params.get('request_id')
+    if not request_id:
+        return {'status': 'refused', 'error': 'contract_not_found'}
+    if state.poll(request_id):
+        return {'status': 'in_progress', 'next_retry': state.next_retry}
+    return {'status': 'success', 'payment_id': request_id, 'balance': 1000.45,
+            'payee': '410011161616877', 'credit_amount': '1.00'}
+
+
+def instance_id(state, params):
+    return {'status': 'success', 'instance_id': 'instance-' + params.get('client_id', '')}
+
+
+def request_external_payment(state, params):
+    if 'instance_id' not in params:
+        return {'status': 'refused', 'error': 'illegal_param_instance_id'}
+    if params.get('to') == 'unknown':
+        return {'status': 'refused', 'error': 'payee_not_found'}
+    return {'status': 'success', 'request_id': state.new_id(),
+            'contract_amount': params.get('amount', '1.00'), 'title': 'Mock payment'}
+
+
+def process_external_payment(state, params):
+    request_id = params.get('request_id')
+    if not request_id:
+        return {'status': 'refused', 'error': 'illegal_param_request_id'}
+    if state.poll('ext-' + request_id):
+        return {'status': 'in_progress', 'next_retry': state.next_retry}
+    return {'status': 'success', 'invoice_id': request_id}
+
+
+def incoming_transfer_accept(state, params):
+    if params.get('protection_code') == 'wrong':
+        return {'status': 'refused', 'error': 'illegal_param_protection_code',
+                'protection_code_attempts_available': 2}
+    return {'status': 'success'}
+
+
+def simple_success(state, params):
+    return {'status': 'success'}
+
+
+def token_aux(state, params):
+    return {'aux_token': 'aux-' + state.new_id()}
+
+
+def oauth_token(state, params):
+    if params.get('code') == 'bad':
+        return {'error': 'invalid_grant'}
+    return {'access_token': 'token-' + state.new_id()}
+
+
+ROUTES = {
+    '/api/account-info': account_info,
+    '/api/operation-history': operation_history,
+    '/api/request-payment': request_payment,
+    '/api/process-payment': process_payment,
+    '/api/instance-id': instance_id,
+    '/api/request-external-payment': request_external_payment,
+    '/api/process-external-payment': process_external_payment,
+    '/api/incoming-transfer-accept': incoming_transfer_accept,
+    '/api/incoming-transfer-reject': simple_success,
+    '/api/token-aux': token_aux,
+    '/api/revoke': simple_success,
+    '/oauth/token': oauth_token,
+}
+
+
+class MockHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pooled transports can reuse
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8') if length else ''
+        params = dict(parse_qsl(raw))
+        route = ROUTES.get(self.path)
+        if route is None:
+            return self.reply(404, {'error': 'not_found'})
+        if self.path.startswith('/api/') and self.path not in ('/api/instance-id',
+                                                               '/api/request-external-payment',
+                                                               '/api/process-external-payment'):
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                return self.reply(401, {})
+        self.reply(200, route(self.server.state, params))
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port=0, state=None):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), MockHandler)
+        self.state = state or MockState()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    server = MockServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    print('Serving mock Yandex.Money API on', server.url)
+    server.serve_forever()
@@ -0,0 +1,60 @@
+"""Replay recorded API traffic through the SDK without network access.
+
+    python -m benchmarks.replay traffic.jsonl.gz [--speed 10] [--concurrency 8]
+                                                 [--loops 3] [--profile]
+
+Record the traffic first with yandex_money.replay.RecordingTransport.
+--speed 0 replays as fast as possible; --profile prints the functions the
+SDK spent most CPU time in.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import argparse
+import json
+import sys
+
+from yandex_money.replay import Replayer
+
+from .run import percentile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='time scale of the recording, 0 for no waiting')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--loops', type=int, default=1)
+    parser.add_argument('--profile', action='store_true', help='print a cProfile summary')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    replayer = Replayer(args.recording, speed=args.speed or None,
+                        concurrency=args.concurrency)
+    if args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        result = profiler.runcall(replayer.run, args.loops)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+    else:
+        result = replayer.run(args.loops)
+
+    latencies = result.pop('latencies')
+    result.update(p50_ms=percentile(latencies, 0.50) * 1000,
+                  p99_ms=percentile(latencies, 0.99) * 1000)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print('{calls} calls in {elapsed:.2f} s: {throughput:.1f} calls/s  '
+              'p50 {p50_ms:.2f} ms  p99 {p99_ms:.2f} ms'.format(**result))
+        for outcome, count in sorted(result['outcomes'].items()):
+            print('  {:<40} {}'.format(outcome, count))
+    return result
+
+
+if __name__ == '__main__':
+    main()
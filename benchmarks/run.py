@@ -0,0 +1,199 @@
+"""SDK overhead benchmarks against the local mock server.
+
+    python -m benchmarks.run [--calls 500] [--concurrency 16] [--modes sync,pooled]
+
+Reports throughput, latency percentiles and peak memory allocated per call
+for every scenario and transport mode. No network access is needed.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import argparse
+import json
+import sys
+import threading
+import timeit
+import tracemalloc
+
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.retry import RetryPolicy, RetryTransport
+from yandex_money.transport import RequestsTransport, SessionTransport
+
+from .mock_server import MockServer, MockState
+
+timer = timeit.default_timer
+
+MODES = ('sync', 'pooled', 'concurrent', 'async')
+
+
+def bind(cls, url):
+    return type(cls.__name__, (cls,), {'MONEY_URL': url, 'SP_MONEY_URL': url})
+
+
+class Clients(object):
+    def __init__(self, url, transport):
+        transport = RetryTransport(transport, RetryPolicy(jitter=False))
+        self.wallet = bind(Wallet, url)('token', transport=transport)
+        self.external = bind(ExternalPayment, url)('client', transport=transport)
+
+
+def account_info(clients, index):
+    clients.wallet.account_info().balance_details.total
+
+
+def wallet_payment(clients, index):
+    request = clients.wallet.request_payment({'pattern_id': 'p2p', 'to': '410011161616877',
+                                              'amount_due': '1.00'})
+    clients.wallet.process_payment({'request_id': request.request_id})
+
+
+def operation_history(clients, index):
+    for operation in clients.wallet.iter_operation_history({'records': 100}):
+        operation['operation_id']
+
+
+def external_payment(clients, index):
+    request = clients.external.request({'pattern_id': 'p2p', 'to': '410011161616877',
+                                        'amount': '1.00'})
+    clients.external.process({'request_id': request.request_id,
+                              'ext_auth_success_uri': 'http://localhost/ok',
+                              'ext_auth_fail_uri': 'http://localhost/fail'})
+
+
+SCENARIOS = {
+    'account_info': account_info,
+    'wallet_payment': wallet_payment,
+    'operation_history': operation_history,
+    'external_payment': external_payment,
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, peak_per_call):
+    latencies = sorted(latencies)
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_kib_per_call': peak_per_call / 1024.0 if peak_per_call is not None else None,
+    }
+
+
+def measure_allocations(scenario, clients, calls):
+    calls = max(1, min(calls, 50))
+    tracemalloc.start()
+    peaks = []
+    try:
+        for index in range(calls):
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+                tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            scenario(clients, index)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def run_serial(scenario, clients, calls):
+    latencies = []
+    started = timer()
+    for index in range(calls):
+        call_started = timer()
+        scenario(clients, index)
+        latencies.append(timer() - call_started)
+    return latencies, timer() - started
+
+
+def run_threads(scenario, clients, calls, concurrency):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            call_started = timer()
+            scenario(clients, index)
+            local.append(timer() - call_started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, timer() - started
+
+
+def run_async(name, url, calls, concurrency):
+    from .async_scenarios import run
+    return run(name, url, calls, concurrency)
+
+
+def run_benchmark(name, mode, url, calls, concurrency):
+    scenario = SCENARIOS[name]
+    if mode == 'async':
+        latencies, elapsed = run_async(name, url, calls, concurrency)
+        return summarize(latencies, elapsed, None)
+
+    transport = RequestsTransport() if mode == 'sync' else \
+        SessionTransport(pool_maxsize=max(concurrency, 10))
+    clients = Clients(url, transport)
+    scenario(clients, 0)  # warm up caches and connections
+    if mode == 'concurrent':
+        latencies, elapsed = run_threads(scenario, clients, calls, concurrency)
+    else:
+        latencies, elapsed = run_serial(scenario, clients, calls)
+    peak = measure_allocations(scenario, clients, calls)
+    transport.close()
+    return summarize(latencies, elapsed, peak)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=1000,
+                        help='operation history size served by the mock')
+    parser.add_argument('--modes', default='sync,pooled,concurrent')
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS)))
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockServer(state=MockState(operations=args.operations)) as server:
+        for name in args.scenarios.split(','):
+            for mode in args.modes.split(','):
+                result = run_benchmark(name, mode, server.url, args.calls, args.concurrency)
+                result.update(scenario=name, mode=mode)
+                results.append(result)
+                if not args.json:
+                    peak = result['peak_kib_per_call']
+                    print('{scenario:<18} {mode:<10} {throughput:>9.1f} calls/s  '
+                          'p50 {p50_ms:>7.2f} ms  p90 {p90_ms:>7.2f} ms  '
+                          'p99 {p99_ms:>7.2f} ms  peak {peak:>8} KiB/call'
+                          .format(peak='n/a' if peak is None else '{:.1f}'.format(peak),
+                                  **result))
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return results
+
+
+if __name__ == '__main__':
+    main()
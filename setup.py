@@ -28,6 +28,10 @@ setup(
         "requests>2.4.0",
         "six"
     ],
+    extras_require={
+        "async": ["aiohttp>=3.0"],
+        "fast-json": ["orjson"],
+    },
     test_suite="nose.collector",
     tests_require=[
         "nose"
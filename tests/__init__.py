@@ -0,0 +1,35 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+
+import responses
+
+
+class FakeClock(object):
+    """Callable clock whose sleep() only advances the time."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+def add_response(path, status, body):
+    """Register a JSON answer for POST requests to any URL ending in ``path``."""
+    responses.add(responses.POST, re.compile('https?://.*' + path),
+                  status=status, body=json.dumps(body),
+                  content_type='application/json')
+
+
+def add_callback(path, callback):
+    """Answer POST requests to any URL ending in ``path`` with ``callback``."""
+    responses.add_callback(responses.POST, re.compile('https?://.*' + path),
+                           callback=callback, content_type='application/json')
@@ -0,0 +1,167 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import threading
+import unittest
+
+from requests.exceptions import HTTPError
+from six.moves.urllib.parse import parse_qsl
+
+from benchmarks.mock_server import MockServer
+from yandex_money import exceptions
+from yandex_money.ratelimit import RateLimiter
+
+try:
+    import asyncio
+    from yandex_money.aio import (AsyncWallet, AsyncExternalPayment, AsyncBreakerTransport,
+                                  AiohttpTransport, acquire_rate_limit, _Response, aiohttp)
+except (ImportError, SyntaxError):
+    asyncio = aiohttp = None
+
+
+class FakeTransport(object):
+    def __init__(self, responses, delay=None):
+        self.responses = responses
+        self.delay = delay
+        self.calls = []
+
+    def post(self, url, headers=None, data=None):
+        self.calls.append((url, headers, data))
+        status_code, body = self.responses[url.rsplit('/', 1)[-1]]
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        response = _Response(url, status_code, json.dumps(body).encode('utf-8'))
+        if self.delay is None:
+            future.set_result(response)
+        else:
+            loop.call_later(self.delay, future.set_result, response)
+        return future
+
+
+@unittest.skipIf(asyncio is None, 'asyncio client requires Python 3.6+')
+class AsyncTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        AsyncExternalPayment.zero_cache()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def testAccountInfo(self):
+        transport = FakeTransport({'account-info': (200, {'balance': 10})})
+        api = AsyncWallet('token', transport=transport)
+
+        response = self.run_async(api.account_info())
+
+        self.assertEqual(response.balance, 10)
+        url, headers, _ = transport.calls[0]
+        self.assertEqual(url, 'https://money.yandex.ru/api/account-info')
+        self.assertEqual(headers['Authorization'], 'Bearer token')
+
+    def testErrorMapping(self):
+        transport = FakeTransport({'account-info': (401, {}),
+                                   'token': (400, {})})
+        api = AsyncWallet('token', transport=transport)
+
+        self.assertRaises(exceptions.TokenError, self.run_async, api.account_info())
+        self.assertRaises(exceptions.FormatError, self.run_async,
+                          AsyncWallet.get_access_token('id', 'code', 'uri',
+                                                       transport=transport))
+
+    def testExternalPayment(self):
+        transport = FakeTransport({
+            'instance-id': (200, {'status': 'success', 'instance_id': '123'}),
+            'request-external-payment': (200, {'status': 'success', 'request_id': '1'}),
+            'process-external-payment': (200, {'status': 'refused',
+                                               'error': 'illegal_params'}),
+        })
+        api = AsyncExternalPayment('client', transport=transport)
+
+        response = self.run_async(api.request({'amount': 1}))
+        self.assertEqual(response.request_id, '1')
+        self.assertEqual(dict(parse_qsl(transport.calls[1][2]))['instance_id'], '123')
+
+        self.assertRaises(exceptions.YandexPaymentError, self.run_async,
+                          api.process({'request_id': '1'}))
+        self.assertEqual(len(transport.calls), 3)
+
+    def testInstanceIdFetchesPerLoop(self):
+        transport = FakeTransport({'instance-id': (200, {'status': 'success',
+                                                         'instance_id': '123'})}, delay=0.2)
+        api = AsyncExternalPayment('client', transport=transport)
+        results = []
+
+        def fetch():
+            loop = asyncio.new_event_loop()
+            try:
+                results.append(loop.run_until_complete(api.get_instance_id()))
+            finally:
+                loop.close()
+
+        threads = [threading.Thread(target=fetch) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['123', '123'])
+        self.assertEqual(len(transport.calls), 2)
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def testTransportOnSeveralLoops(self):
+        transport = AiohttpTransport()
+        with MockServer() as server:
+            class LocalWallet(AsyncWallet):
+                MONEY_URL = server.url
+
+            wallet = LocalWallet('token', transport=transport)
+            loops = [asyncio.new_event_loop() for _ in range(2)]  # like two asyncio.run()
+            try:
+                for loop in loops:
+                    self.assertIn('balance', loop.run_until_complete(wallet.account_info()))
+                for loop in loops:
+                    loop.run_until_complete(transport.close())
+            finally:
+                for loop in loops:
+                    loop.close()
+
+    def run_once(self):
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+    def testCancelledAfterSlotHandedOver(self):
+        limiter = RateLimiter(max_in_flight=1)
+        limiter.limit('key').in_flight.acquire()
+        task = self.loop.create_task(acquire_rate_limit(limiter, 'key'))
+        self.run_once()  # the task waits for the slot
+
+        limiter.release('key')
+        self.run_once()  # the slot is handed to the task before it resumes
+        task.cancel()
+
+        self.assertRaises(asyncio.CancelledError, self.run_async, task)
+        self.assertEqual(limiter.limit('key').in_flight.in_flight, 0)
+
+    def testBreaker(self):
+        inner = FakeTransport({'account-info': (503, {})})
+        transport = AsyncBreakerTransport(inner, min_calls=2, open_timeout=60)
+        wallet = AsyncWallet('token', transport=transport)
+
+        for _ in range(2):
+            self.assertRaises(HTTPError, self.run_async, wallet.account_info())
+        self.assertRaises(exceptions.CircuitOpenError, self.run_async, wallet.account_info())
+        self.assertEqual(len(inner.calls), 2)
+
+    def testBreakerIgnoresCancellation(self):
+        inner = FakeTransport({'account-info': (200, {})}, delay=1)
+        transport = AsyncBreakerTransport(inner, min_calls=1, open_timeout=60)
+        wallet = AsyncWallet('token', transport=transport)
+
+        self.assertRaises(asyncio.TimeoutError, self.run_async,
+                          asyncio.wait_for(wallet.account_info(), 0.01))
+
+        self.assertEqual(transport.stats()['wallet']['calls'], 0)
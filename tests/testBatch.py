@@ -0,0 +1,170 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import threading
+import time
+import unittest
+
+from yandex_money.batch import BatchPaymentExecutor, IncomingTransferProcessor, REJECT
+
+
+class FakeWallet(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.process_calls = {}
+
+    def request_payment(self, options):
+        if options['to'] == 'unknown':
+            return {'status': 'refused', 'error': 'payee_not_found'}
+        if options['to'] == 'broken':
+            raise ValueError('broken')
+        return {'status': 'success', 'request_id': options['to']}
+
+    def process_payment(self, options):
+        with self.lock:
+            calls = self.process_calls.get(options['request_id'], 0) + 1
+            self.process_calls[options['request_id']] = calls
+        if options['request_id'] == 'slow' and calls < 3:
+            return {'status': 'in_progress', 'next_retry': 500}
+        if options['request_id'] == 'flaky' and calls < 2:
+            return {'status': 'refused', 'error': 'technical_error', 'next_retry': 200}
+        if options['request_id'] == 'poor':
+            return {'status': 'refused', 'error': 'not_enough_funds'}
+        return {'status': 'success', 'payment_id': options['request_id']}
+
+
+class FakeTransferWallet(object):
+    CODES = {'op1': '1111', 'op2': '2222', 'op3': '3333'}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = dict((operation_id, 3) for operation_id in self.CODES)
+        self.calls = []
+        self.active = set()
+        self.overlaps = 0
+
+    def _enter(self, operation_id, code):
+        with self.lock:
+            self.calls.append((operation_id, code))
+            if operation_id in self.active:
+                self.overlaps += 1
+            self.active.add(operation_id)
+        time.sleep(0.005)  # long enough for a second call of the id to overlap
+
+    def incoming_transfer_accept(self, operation_id, protection_code=None):
+        self._enter(operation_id, protection_code)
+        try:
+            if operation_id == 'busy' and self.calls.count(('busy', None)) < 2:
+                return {'status': 'refused', 'error': 'technical_error', 'next_retry': 100}
+            if operation_id not in self.CODES or protection_code == self.CODES[operation_id]:
+                return {'status': 'success'}
+            self.attempts[operation_id] -= 1
+            return {'status': 'refused', 'error': 'illegal_param_protection_code',
+                    'protection_code_attempts_available': self.attempts[operation_id]}
+        finally:
+            self.active.discard(operation_id)
+
+    def incoming_transfer_reject(self, operation_id):
+        self._enter(operation_id, REJECT)
+        self.active.discard(operation_id)
+        if operation_id == 'gone':
+            raise ValueError('gone')
+        return {'status': 'success'}
+
+
+class BatchTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.wallet = FakeWallet()
+        self.sleeps = []
+        self.executor = BatchPaymentExecutor(self.wallet, max_workers=4,
+                                             sleep=self.sleeps.append)
+
+    def testRun(self):
+        specs = [{'to': str(i)} for i in range(20)]
+        specs += [{'to': 'unknown'}, {'to': 'broken'}, ({'to': 'slow'}, {'csc': '000'})]
+
+        results = sorted(self.executor.run(specs), key=lambda result: result.index)
+
+        self.assertEqual(len(results), len(specs))
+        self.assertTrue(all(result.ok for result in results[:20]))
+        self.assertEqual(results[20].request['error'], 'payee_not_found')
+        self.assertFalse(results[20].ok)
+        self.assertIsInstance(results[21].error, ValueError)
+        self.assertTrue(results[22].ok)
+        self.assertEqual(self.wallet.process_calls['slow'], 3)
+        self.assertEqual(self.sleeps, [0.5, 0.5])
+
+    def testFailingSpecs(self):
+        def specs():
+            yield {'to': '1'}
+            raise ValueError('bad spec')
+
+        results = []
+        with self.assertRaises(ValueError):
+            for result in self.executor.run(specs()):
+                results.append(result)
+        self.assertEqual(len(results), 1)
+
+    def testMaxAttempts(self):
+        executor = BatchPaymentExecutor(self.wallet, max_attempts=2,
+                                        sleep=self.sleeps.append)
+        result, = executor.run([{'to': 'slow'}])
+        self.assertEqual(result.process['status'], 'in_progress')
+        self.assertFalse(result.ok)
+        # no wait after the last attempt
+        self.assertEqual(self.sleeps, [0.5])
+
+    def testRetryableRefusal(self):
+        results = sorted(self.executor.run([{'to': 'flaky'}, {'to': 'poor'}]),
+                         key=lambda result: result.index)
+
+        self.assertTrue(results[0].ok)
+        self.assertEqual(self.wallet.process_calls, {'flaky': 2, 'poor': 1})
+        self.assertEqual(results[1].process['error'], 'not_enough_funds')
+        self.assertEqual(self.sleeps, [0.2])
+
+
+class IncomingTransfersTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.wallet = FakeTransferWallet()
+        self.sleeps = []
+
+    def run_decisions(self, decisions, **options):
+        processor = IncomingTransferProcessor(self.wallet, max_workers=4,
+                                              sleep=self.sleeps.append, **options)
+        return processor, sorted(processor.run(decisions), key=lambda result: result.index)
+
+    def testOutcomes(self):
+        processor, results = self.run_decisions([
+            ('op1', '1111'), ('op2', '0000'), ('plain', None), ('op3', REJECT),
+            ('gone', REJECT), ('busy', None)])
+
+        self.assertEqual([result.outcome for result in results],
+                         ['accepted', 'wrong_code', 'accepted', 'rejected', 'error', 'accepted'])
+        self.assertEqual(results[1].attempts_available, 2)
+        self.assertIsInstance(results[4].error, ValueError)
+        self.assertEqual(self.sleeps, [0.1])
+        self.assertEqual(processor.attempts_available, {'op2': 2})
+
+    def testCandidateCodes(self):
+        _, results = self.run_decisions([('op1', ['0000', '1111']),
+                                         ('op2', ['0000', '0001', '0002', '2222'])])
+
+        self.assertEqual(results[0].outcome, 'accepted')
+        self.assertEqual(results[1].outcome, 'codes_exhausted')
+        self.assertEqual(self.wallet.calls.count(('op2', '2222')), 0)
+
+    def testKeepAttempts(self):
+        _, results = self.run_decisions([('op2', ['0000', '0001', '2222'])], keep_attempts=1)
+
+        self.assertEqual(results[0].outcome, 'wrong_code')
+        self.assertEqual(results[0].attempts_available, 1)
+        self.assertEqual(len(self.wallet.calls), 2)
+
+    def testSameOperationIsSerialized(self):
+        processor, results = self.run_decisions([('op2', '0000')] * 6)
+
+        self.assertEqual(self.wallet.overlaps, 0)
+        self.assertEqual(len(self.wallet.calls), 3)
+        self.assertEqual(sorted(result.outcome for result in results),
+                         ['codes_exhausted'] * 4 + ['wrong_code'] * 2)
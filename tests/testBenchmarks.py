@@ -0,0 +1,32 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import unittest
+
+from benchmarks import import_time
+
+try:
+    from benchmarks import run as benchmarks
+except ImportError:  # tracemalloc is Python 3.4+
+    benchmarks = None
+
+
+@unittest.skipIf(benchmarks is None, 'benchmarks require Python 3.4+')
+class BenchmarksTestSuite(unittest.TestCase):
+    def testSmoke(self):
+        results = benchmarks.main(['--calls', '2', '--concurrency', '2',
+                                   '--operations', '150', '--json',
+                                   '--modes', 'sync,pooled,concurrent'])
+
+        self.assertEqual(len(results), len(benchmarks.SCENARIOS) * 3)
+        for result in results:
+            self.assertEqual(result['calls'], 2)
+            self.assertGreater(result['throughput'], 0)
+
+
+class ImportTimeTestSuite(unittest.TestCase):
+    def testNetworkingIsImportedLazily(self):
+        result = import_time.main(['--runs', '1', '--budget-ms', '10000', '--json'])
+
+        self.assertEqual(result['loaded'], [])
+        self.assertTrue(result['ok'])
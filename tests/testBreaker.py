@@ -0,0 +1,148 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import unittest
+
+import requests
+
+from yandex_money import exceptions
+from yandex_money.api import Wallet
+from yandex_money.breaker import (BreakerTransport, CircuitBreaker, endpoint_group,
+                                  CLOSED, OPEN, HALF_OPEN)
+from yandex_money.transport import Transport
+from tests import FakeClock
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode('utf-8')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        raise requests.HTTPError(response=self)
+
+
+class FlakyTransport(Transport):
+    def __init__(self, clock):
+        self.clock = clock
+        self.status_code = 200
+        self.error = None
+        self.latency = 0.0
+        self.interrupt = False
+        self.calls = 0
+
+    def post(self, url, headers=None, data=None):
+        self.calls += 1
+        self.clock.now += self.latency
+        if self.interrupt:
+            raise KeyboardInterrupt
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self.status_code, {'account': '4100'})
+
+
+class BreakerTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.changes = []
+        self.inner = FlakyTransport(self.clock)
+        self.transport = BreakerTransport(
+            self.inner, window=4, min_calls=4, failure_rate=0.5, slow_call=2.0,
+            open_timeout=10.0, clock=self.clock,
+            on_state_change=lambda *change: self.changes.append(change))
+        self.wallet = Wallet('token', transport=self.transport)
+
+    def fail_calls(self, times):
+        for _ in range(times):
+            self.assertRaises(requests.HTTPError, self.wallet.account_info)
+
+    def testEndpointGroups(self):
+        self.assertEqual(endpoint_group(Wallet.SP_MONEY_URL + '/oauth/token'), 'oauth')
+        self.assertEqual(endpoint_group(Wallet.MONEY_URL + '/api/instance-id'), 'external')
+        self.assertEqual(endpoint_group(Wallet.MONEY_URL + '/api/account-info'), 'wallet')
+
+    def testTripsOnErrorRateAndFailsFast(self):
+        self.wallet.account_info()
+        self.wallet.account_info()
+        self.inner.status_code = 503
+        self.fail_calls(2)
+
+        with self.assertRaises(exceptions.CircuitOpenError) as context:
+            self.wallet.account_info()
+
+        self.assertIsInstance(context.exception, exceptions.APIException)
+        self.assertEqual(context.exception.group, 'wallet')
+        self.assertEqual(context.exception.retry_after, 10.0)
+        self.assertEqual(self.inner.calls, 4)
+        self.assertEqual(self.changes, [('wallet', CLOSED, OPEN)])
+        # other endpoint groups are not affected
+        self.assertEqual(self.transport.breaker(Wallet.MONEY_URL + '/api/instance-id').state,
+                         CLOSED)
+
+    def testTripsOnLatency(self):
+        self.inner.latency = 2.5
+        for _ in range(4):
+            self.wallet.account_info()
+
+        self.assertRaises(exceptions.CircuitOpenError, self.wallet.account_info)
+
+    def testConnectionErrorsCount(self):
+        self.inner.error = requests.ConnectionError()
+        for _ in range(4):
+            self.assertRaises(requests.ConnectionError, self.wallet.account_info)
+
+        self.assertRaises(exceptions.CircuitOpenError, self.wallet.account_info)
+
+    def testHalfOpenProbe(self):
+        self.inner.status_code = 500
+        self.fail_calls(4)
+        self.clock.now += 10
+
+        # a failed probe opens the circuit again
+        self.fail_calls(1)
+        self.assertRaises(exceptions.CircuitOpenError, self.wallet.account_info)
+        self.clock.now += 10
+        self.inner.status_code = 200
+        self.wallet.account_info()
+
+        breaker = self.transport.breaker(Wallet.MONEY_URL + '/api/account-info')
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(self.changes, [('wallet', CLOSED, OPEN), ('wallet', OPEN, HALF_OPEN),
+                                        ('wallet', HALF_OPEN, OPEN), ('wallet', OPEN, HALF_OPEN),
+                                        ('wallet', HALF_OPEN, CLOSED)])
+        self.assertEqual(breaker.stats()['opened'], 2)
+
+    def testOneProbeAtATime(self):
+        breaker = CircuitBreaker(min_calls=1, open_timeout=1, clock=self.clock)
+        breaker.record(breaker.before_call(), True, 0.1)
+        self.clock.now += 1
+
+        self.assertTrue(breaker.before_call())
+        self.assertRaises(exceptions.CircuitOpenError, breaker.before_call)
+        breaker.record(True, False, 0.1)
+        self.assertFalse(breaker.before_call())
+
+    def testInterruptedCallsAreNotFailures(self):
+        self.inner.interrupt = True
+        for _ in range(4):
+            self.assertRaises(KeyboardInterrupt, self.wallet.account_info)
+        breaker = self.transport.breaker(Wallet.MONEY_URL + '/api/account-info')
+        self.assertEqual(breaker.stats()['calls'], 0)
+
+        self.inner.interrupt = False
+        self.inner.status_code = 500
+        self.fail_calls(4)
+        self.clock.now += 10
+        # an interrupted probe gives its slot back and leaves the circuit half-open
+        self.inner.interrupt = True
+        self.assertRaises(KeyboardInterrupt, self.wallet.account_info)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.inner.interrupt = False
+        self.inner.status_code = 200
+        self.wallet.account_info()
+        self.assertEqual(breaker.state, CLOSED)
@@ -0,0 +1,134 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from yandex_money.api import ExternalPayment
+from yandex_money.cache import InstanceIdCache
+from yandex_money import storage
+from yandex_money.storage import FileStore, MmapStore, SqliteStore
+
+
+class FetchingExternalPayment(ExternalPayment):
+    fetches = []
+
+    def _fetch_instance_id(self):
+        self.fetches.append(self.client_id)
+        time.sleep(0.05)
+        return 'instance-' + self.client_id
+
+
+class InstanceIdCacheTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        FetchingExternalPayment.fetches = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        ExternalPayment.zero_cache()
+
+    def testKeyedByClientId(self):
+        cache = InstanceIdCache()
+        first = FetchingExternalPayment('a', instance_id_cache=cache)
+        second = FetchingExternalPayment('b', instance_id_cache=cache)
+
+        self.assertEqual(first.instance_id, 'instance-a')
+        self.assertEqual(second.instance_id, 'instance-b')
+        self.assertEqual(first.instance_id, 'instance-a')
+        self.assertEqual(FetchingExternalPayment.fetches, ['a', 'b'])
+
+    def testSingleFlight(self):
+        cache = InstanceIdCache()
+        results = []
+
+        def lookup():
+            results.append(FetchingExternalPayment('a', instance_id_cache=cache).instance_id)
+
+        threads = [threading.Thread(target=lookup) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['instance-a'] * 10)
+        self.assertEqual(FetchingExternalPayment.fetches, ['a'])
+
+    def testFailedFetchIsNotCached(self):
+        cache = InstanceIdCache()
+
+        def fail():
+            raise ValueError('failed')
+
+        self.assertRaises(ValueError, cache.get_or_fetch, 'a', fail)
+        self.assertEqual(cache.get_or_fetch('a', lambda: '1'), '1')
+
+    def assertPersistent(self, make_store):
+        FetchingExternalPayment('a', instance_id_cache=InstanceIdCache(make_store())).instance_id
+        api = FetchingExternalPayment('a', instance_id_cache=InstanceIdCache(make_store()))
+
+        self.assertEqual(api.instance_id, 'instance-a')
+        self.assertEqual(FetchingExternalPayment.fetches, ['a'])
+
+    def testFileStore(self):
+        path = os.path.join(self.directory, 'instance_ids.json')
+        self.assertPersistent(lambda: FileStore(path))
+
+    def testSqliteStore(self):
+        path = os.path.join(self.directory, 'state.sqlite')
+        self.assertPersistent(lambda: SqliteStore(path))
+
+    def testMmapStore(self):
+        path = os.path.join(self.directory, 'state.mmap')
+        self.assertPersistent(lambda: MmapStore(path))
+
+    def testMmapStoreGrows(self):
+        path = os.path.join(self.directory, 'state.mmap')
+        writer, reader = MmapStore(path, size=64), MmapStore(path, size=64)
+        reader.get('a')
+
+        for index in range(100):
+            writer.set('key{}'.format(index), 'x' * 50)
+
+        self.assertEqual(reader.get('key99'), 'x' * 50)
+        self.assertEqual(len(reader.keys()), 100)
+        writer.delete('key0')
+        self.assertIsNone(reader.get('key0'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def testMmapStoreSharedByForkedWorkers(self):
+        store = MmapStore(os.path.join(self.directory, 'state.mmap'))
+        store.set('parent', 1)
+        children = []
+        for worker in range(4):
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover
+                try:
+                    for index in range(25):
+                        store.set('{}-{}'.format(worker, index), index)
+                finally:
+                    os._exit(0)
+            children.append(pid)
+        for pid in children:
+            os.waitpid(pid, 0)
+
+        self.assertEqual(len(store.keys()), 101)
+        self.assertEqual(store.get('3-24'), 24)
+
+    def testDefaultStoreAndClear(self):
+        shared = storage.MemoryStore()
+        storage.set_default_store(shared)
+        try:
+            shared.set('other', 'kept')
+            cache = InstanceIdCache()
+            cache.set('a', 'instance-a')
+
+            self.assertEqual(shared.get('instance_id:a'), 'instance-a')
+            cache.clear()
+            self.assertEqual(shared.keys(), ['other'])
+        finally:
+            storage.set_default_store(None)
@@ -0,0 +1,112 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import unittest
+
+import responses
+
+from yandex_money import exceptions, instrumentation
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.instrumentation import Hook, MetricsCollector
+from yandex_money.retry import RetryPolicy, RetryTransport
+from yandex_money.transport import SessionTransport
+from tests import add_response
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+class RecordingHook(Hook):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, endpoint, body):
+        self.events.append(('before', endpoint))
+
+    def after_request(self, endpoint, elapsed, status_code, error):
+        self.events.append(('after', endpoint, status_code, type(error).__name__))
+
+
+class InstrumentationTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.metrics = instrumentation.add_hook(MetricsCollector())
+
+    def tearDown(self):
+        instrumentation.remove_hook(self.metrics)
+        ExternalPayment.zero_cache()
+
+    @responses.activate
+    def testHooks(self):
+        hook = instrumentation.add_hook(RecordingHook())
+        add_response('/api/account-info', 200, {'balance': 1})
+        add_response('/api/operation-history', 401, {})
+        try:
+            api = Wallet('token')
+            api.account_info()
+            self.assertRaises(exceptions.TokenError, api.operation_history, {})
+        finally:
+            instrumentation.remove_hook(hook)
+
+        self.assertEqual(hook.events, [
+            ('before', '/api/account-info'),
+            ('after', '/api/account-info', 200, 'NoneType'),
+            ('before', '/api/operation-history'),
+            ('after', '/api/operation-history', 401, 'TokenError'),
+        ])
+
+    @responses.activate
+    def testMetrics(self):
+        add_response('/api/account-info', 200, {'balance': 1})
+        add_response('/api/request-external-payment', 200,
+                     {'status': 'refused', 'error': 'illegal_params'})
+        add_response('/api/process-payment', 503, {})
+        add_response('/api/process-payment', 200, {'status': 'success'})
+
+        transport = self.metrics.watch_transport(SessionTransport())
+        api = Wallet('token', transport=RetryTransport(
+            transport, RetryPolicy(jitter=False), sleep=lambda delay: None))
+        api.account_info()
+        api.account_info()
+        api.process_payment({'request_id': '1'})
+        self.assertRaises(exceptions.YandexPaymentError,
+                          ExternalPayment(instance_id='1').request, {})
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['requests'], {
+            ('/api/account-info', 'ok'): 2,
+            ('/api/process-payment', 'ok'): 1,
+            ('/api/request-external-payment', 'YandexPaymentError:illegal_params'): 1,
+        })
+        self.assertEqual(snapshot['retries'], {('/api/process-payment', 'http_503'): 1})
+        self.assertEqual(snapshot['latency']['/api/account-info']['count'], 2)
+        self.assertEqual(snapshot['in_flight'], 0)
+        self.assertIn('connections_reused', snapshot['connections'])
+
+        text = self.metrics.render_prometheus()
+        self.assertIn('yandex_money_requests_total{endpoint="/api/account-info",outcome="ok"} 2',
+                      text)
+        self.assertIn('yandex_money_request_duration_seconds_bucket'
+                      '{endpoint="/api/account-info",le="+Inf"} 2', text)
+
+    @unittest.skipIf(prometheus_client is None, 'prometheus_client is not installed')
+    @responses.activate
+    def testPrometheusCollector(self):
+        add_response('/api/account-info', 200, {'balance': 1})
+        Wallet('token').account_info()
+        registry = prometheus_client.CollectorRegistry()
+        registry.register(self.metrics)
+
+        text = prometheus_client.generate_latest(registry).decode('utf-8')
+
+        self.assertIn('# TYPE yandex_money_requests_total counter', text)
+        self.assertNotIn('_total_total', text)
+        self.assertEqual(registry.get_sample_value(
+            'yandex_money_requests_total',
+            {'endpoint': '/api/account-info', 'outcome': 'ok'}), 1)
+        self.assertEqual(registry.get_sample_value(
+            'yandex_money_request_duration_seconds_count',
+            {'endpoint': '/api/account-info'}), 1)
+        self.assertIn('# TYPE yandex_money_requests_total counter',
+                      self.metrics.render_prometheus())
@@ -0,0 +1,46 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+import responses
+
+from yandex_money import jsonutil
+from yandex_money.api import ExternalPayment
+
+
+class JsonBackendTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.backend = jsonutil.get_json_backend()
+        self.decoded = []
+
+        def counting_loads(data):
+            self.decoded.append(data)
+            return json.loads(data.decode('utf-8'))
+
+        jsonutil.set_json_backend(counting_loads)
+
+    def tearDown(self):
+        jsonutil.set_json_backend(self.backend)
+        ExternalPayment.zero_cache()
+
+    def testStdlibBackend(self):
+        jsonutil.set_json_backend('json')
+        self.assertEqual(jsonutil.loads(b'{"a": "\\u0444"}'), {'a': 'ф'})
+        self.assertEqual(jsonutil.get_json_backend(), 'json')
+
+    def testUnknownBackend(self):
+        self.assertRaises(ValueError, jsonutil.set_json_backend, 'simplejson2')
+
+    @responses.activate
+    def testExternalPaymentDecodesOnce(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/request-external-payment'),
+                      body=json.dumps({'status': 'success', 'request_id': '1'}),
+                      content_type='application/json')
+
+        response = ExternalPayment(instance_id='1').request({'amount': 1})
+
+        self.assertEqual(response.request_id, '1')
+        self.assertEqual(len(self.decoded), 1)
@@ -0,0 +1,57 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+import responses
+
+from yandex_money.api import Wallet
+from yandex_money.models import (AccountInfo, BalanceDetails, LinkedCard,
+                                 Operation, OperationHistory, Response,
+                                 model_for_url)
+
+
+class ModelsTestSuite(unittest.TestCase):
+    def testModelForUrl(self):
+        self.assertIs(model_for_url('https://money.yandex.ru/api/account-info'), AccountInfo)
+        self.assertIs(model_for_url('http://localhost:8000/api/operation-history'),
+                      OperationHistory)
+        self.assertIs(model_for_url('https://sp-money.yandex.ru/oauth/token'), Response)
+
+    def testDictCompatibility(self):
+        response = Response({'status': 'success', 'items': 1})
+
+        self.assertEqual(response.status, 'success')
+        self.assertEqual(response.get('items'), 1)
+        self.assertEqual(dict(response), {'status': 'success', 'items': 1})
+        self.assertEqual(sorted(response.keys()), ['items', 'status'])
+        self.assertRaises(KeyError, lambda: response.error)
+        self.assertRaises(AttributeError, lambda: response.error)
+        self.assertIsNone(getattr(response, 'error', None))
+        self.assertFalse(hasattr(response, '__dict__'))
+
+    def testLazyNested(self):
+        info = AccountInfo({'balance_details': {'total': 10},
+                            'cards_linked': [{'pan_fragment': '5280****7918'}],
+                            'services_additional': {'a': 1}})
+
+        self.assertIs(type(info['balance_details']), dict)
+        self.assertIsInstance(info.balance_details, BalanceDetails)
+        self.assertEqual(info.balance_details.total, 10)
+        self.assertIs(info.balance_details, info['balance_details'])
+        self.assertIsInstance(info.cards_linked[0], LinkedCard)
+        self.assertEqual(info.services_additional.a, 1)
+
+    @responses.activate
+    def testOperationHistoryModel(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/operation-history'),
+                      body=json.dumps({'operations': [{'operation_id': '1', 'title': 'x'}]}),
+                      content_type='application/json')
+
+        history = Wallet('token').operation_history({'records': 1})
+
+        self.assertIsInstance(history, OperationHistory)
+        self.assertIsInstance(history.operations[0], Operation)
+        self.assertEqual(history.operations[0].title, 'x')
@@ -0,0 +1,55 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+import responses
+from six.moves.urllib.parse import parse_qsl
+
+from yandex_money.api import Wallet
+
+
+class OperationHistoryTestSuite(unittest.TestCase):
+    records = 3
+    total = 8
+
+    @classmethod
+    def request_callback(cls, request):
+        payload = dict(parse_qsl(request.body))
+        start = int(payload.get('start_record', 0))
+        end = min(start + cls.records, cls.total)
+        body = {'operations': [{'operation_id': str(i)} for i in range(start, end)]}
+        if end < cls.total:
+            body['next_record'] = str(end)
+        return 200, {}, json.dumps(body)
+
+    def setUp(self):
+        self.api = Wallet('token')
+        responses.add_callback(
+            responses.POST, re.compile('https?://.*/api/operation-history'),
+            callback=self.request_callback,
+            content_type='application/json',
+        )
+
+    @responses.activate
+    def testIterOperationHistory(self):
+        operations = self.api.iter_operation_history({'records': self.records})
+        ids = [operation['operation_id'] for operation in operations]
+        self.assertEqual(ids, [str(i) for i in range(self.total)])
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def testIterOperationHistoryPrefetch(self):
+        operations = self.api.iter_operation_history({'records': self.records},
+                                                     prefetch=True)
+        ids = [operation['operation_id'] for operation in operations]
+        self.assertEqual(ids, [str(i) for i in range(self.total)])
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def testIterOperationHistoryIsLazy(self):
+        operations = self.api.iter_operation_history({'records': self.records})
+        self.assertEqual(next(operations)['operation_id'], '0')
+        self.assertEqual(len(responses.calls), 1)
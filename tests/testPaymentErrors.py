@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+import responses
+
+from yandex_money import exceptions
+from yandex_money.api import ExternalPayment
+
+
+class PaymentErrorsTestSuite(unittest.TestCase):
+    def tearDown(self):
+        exceptions.set_locale('ru')
+
+    def testClassesByCode(self):
+        self.assertIsInstance(exceptions.payment_error(exceptions.NOT_ENOUGH_FUNDS),
+                              exceptions.InsufficientFundsError)
+        self.assertIsInstance(exceptions.payment_error('account_blocked'),
+                              exceptions.AccountBlockedError)
+        self.assertEqual(exceptions.payment_error('illegal_param_csc').param, 'csc')
+        self.assertIsNone(exceptions.payment_error('illegal_params').param)
+        unknown = exceptions.payment_error('something_new')
+        self.assertIs(type(unknown), exceptions.YandexPaymentError)
+        self.assertEqual(unknown.code, 'something_new')
+
+    def testRetryable(self):
+        self.assertTrue(exceptions.payment_error('technical_error').retryable)
+        self.assertFalse(exceptions.payment_error('not_enough_funds').retryable)
+        self.assertTrue(exceptions.is_retryable('technical_error'))
+        self.assertFalse(exceptions.is_retryable(None))
+        for code in list(exceptions._error_classes) + ['illegal_params', 'unknown', None]:
+            self.assertEqual(exceptions.is_retryable(code),
+                             exceptions.payment_error(code).retryable, code)
+
+    def testContext(self):
+        error = exceptions.payment_error('account_blocked', {
+            'status': 'refused', 'error': 'account_blocked',
+            'account_unblock_uri': 'https://money.yandex.ru/unblock', 'next_retry': '5000'})
+
+        self.assertEqual(error.account_unblock_uri, 'https://money.yandex.ru/unblock')
+        self.assertEqual(error.next_retry, 5000)
+        self.assertIsNone(error.ext_action_uri)
+        self.assertIsNone(exceptions.payment_error('already_rejected').next_retry)
+
+    def testLocalizedMessages(self):
+        error = exceptions.payment_error('not_enough_funds')
+
+        self.assertEqual(error.message(), exceptions._errors['not_enough_funds'])
+        self.assertEqual(error.args, ('not_enough_funds',))
+        exceptions.set_locale('en')
+        self.assertIn('not have enough funds', '{}'.format(error))
+        self.assertIn('Недостаточно', error.message('ru'))
+        self.assertRaises(ValueError, exceptions.set_locale, 'de')
+
+    @responses.activate
+    def testExternalPaymentRaisesSubclass(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/process-external-payment'),
+                      body=json.dumps({'status': 'refused', 'error': 'ext_action_required',
+                                       'ext_action_uri': 'https://money.yandex.ru/action'}),
+                      content_type='application/json')
+
+        with self.assertRaises(exceptions.ExtActionRequiredError) as context:
+            ExternalPayment(instance_id='1').process({'request_id': '1'})
+
+        self.assertEqual(context.exception.ext_action_uri, 'https://money.yandex.ru/action')
+        self.assertEqual(context.exception.response['status'], 'refused')
@@ -0,0 +1,139 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import threading
+import time
+import unittest
+
+from six.moves import queue
+
+from yandex_money import exceptions
+from yandex_money.api import ExternalPayment
+from yandex_money.poller import StatusPoller
+
+
+class FakeExternalPayment(object):
+    def __init__(self, script):
+        self.script = script  # request_id -> list of responses
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = set()
+        self.overlaps = 0
+
+    def process(self, options):
+        request_id = options['request_id']
+        with self.lock:
+            self.calls.append(request_id)
+            if request_id in self.active:
+                self.overlaps += 1
+            self.active.add(request_id)
+            steps = self.script[request_id]
+            response = steps.pop(0) if len(steps) > 1 else steps[0]
+        time.sleep(0.005)  # long enough for a second poll of the id to overlap
+        with self.lock:
+            self.active.discard(request_id)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class PollerTestSuite(unittest.TestCase):
+    def testPolling(self):
+        payment = FakeExternalPayment({
+            'fast': [{'status': 'success', 'invoice_id': '1'}],
+            'slow': [{'status': 'in_progress', 'next_retry': 10},
+                     {'status': 'in_progress', 'next_retry': 10},
+                     {'status': 'success', 'invoice_id': '2'}],
+            '3ds': [{'status': 'ext_auth_required', 'acs_uri': 'https://bank'},
+                    {'status': 'success', 'invoice_id': '3'}],
+            'bad': [exceptions.YandexPaymentError('payment_refused')],
+        })
+        callbacks = []
+        poller = StatusPoller(payment, max_workers=3, pending_interval=0.01)
+        for request_id in ('fast', 'slow', '3ds', 'bad'):
+            poller.add(request_id, {'ext_auth_success_uri': 'ok'},
+                       callback=callbacks.append)
+        self.assertFalse(poller.add('slow'))
+
+        with poller:
+            results = dict((result.request_id, result)
+                           for result in poller.completed(timeout=5))
+
+        self.assertEqual(sorted(results), ['3ds', 'bad', 'fast', 'slow'])
+        self.assertEqual(results['slow'].response['invoice_id'], '2')
+        self.assertEqual(results['3ds'].status, 'success')
+        self.assertEqual(results['bad'].status, 'refused')
+        self.assertEqual(payment.calls.count('slow'), 3)
+        self.assertEqual(payment.overlaps, 0)
+        self.assertEqual(len(callbacks), 4)
+        self.assertEqual(len(poller), 0)
+
+    def testAddedOnce(self):
+        payment = FakeExternalPayment({'slow': [{'status': 'in_progress', 'next_retry': 1}] * 5
+                                       + [{'status': 'success'}]})
+        poller = StatusPoller(payment, max_workers=8)
+        poller.add('slow')
+
+        with poller:
+            while len(poller):
+                self.assertFalse(poller.add('slow'))
+                time.sleep(0.001)
+            results = list(poller.completed(timeout=5))
+
+        self.assertEqual(payment.overlaps, 0)
+        self.assertEqual(payment.calls.count('slow'), 6)
+        self.assertEqual(len(results), 1)
+
+    def testLastResultIsNotLost(self):
+        poller = StatusPoller(FakeExternalPayment({'late': [{'status': 'success'}]}))
+        poller.add('late')
+
+        class RacingQueue(queue.Queue):
+            def get(self, block=True, timeout=None):
+                if not block and self.empty() and len(poller):
+                    # a worker completes the payment right after the queue was found empty
+                    poller.poll('late')
+                    raise queue.Empty
+                return queue.Queue.get(self, block, timeout)
+
+        poller._results = RacingQueue()
+
+        self.assertEqual([result.request_id for result in poller.completed(timeout=1)],
+                         ['late'])
+
+    def testTimeout(self):
+        payment = FakeExternalPayment({'3ds': [{'status': 'ext_auth_required'}]})
+        poller = StatusPoller(payment, pending_interval=0.01, timeout=0.05)
+        poller.add('3ds')
+
+        with poller:
+            result, = poller.completed(timeout=5)
+
+        self.assertTrue(result.expired)
+        self.assertEqual(result.status, 'ext_auth_required')
+
+    def testRetryableRefusal(self):
+        payment = FakeExternalPayment({'flaky': [
+            exceptions.payment_error('technical_error', {'status': 'refused', 'next_retry': 10,
+                                                         'error': 'technical_error'}),
+            {'status': 'success'}]})
+        poller = StatusPoller(payment)
+        poller.add('flaky')
+
+        with poller:
+            result, = poller.completed(timeout=5)
+
+        self.assertEqual(result.status, 'success')
+        self.assertEqual(payment.calls, ['flaky', 'flaky'])
+
+    def testGetStatus(self):
+        class Payment(ExternalPayment):
+            def process(self, options):
+                if options['request_id'] == 'refused':
+                    raise exceptions.YandexPaymentError('payment_refused')
+                return {'status': options['request_id']}
+
+        api = Payment(instance_id='1')
+        self.assertEqual(api.get_status({'request_id': 'success'}), ExternalPayment._SUCCESS)
+        self.assertEqual(api.get_status({'request_id': 'in_progress'}), ExternalPayment._PROGRESS)
+        self.assertEqual(api.get_status({'request_id': 'refused'}), ExternalPayment._ERROR)
@@ -0,0 +1,111 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import threading
+import time
+import unittest
+
+import responses
+
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.ratelimit import RateLimiter, TokenBucket
+from tests import FakeClock
+
+try:
+    import asyncio
+    from yandex_money.aio import acquire_rate_limit
+except (ImportError, SyntaxError):
+    asyncio = None
+
+
+class RateLimitTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        ExternalPayment.zero_cache()
+
+    def testTokenBucket(self):
+        bucket = TokenBucket(rate=2, burst=2, clock=self.clock)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0, 0, 0.5, 1.0])
+        self.clock.now = 10
+        self.assertEqual(bucket.reserve(), 0)
+
+    @responses.activate
+    def testPerTokenPacing(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/account-info'),
+                      body=json.dumps({'balance': 1}), content_type='application/json')
+        limiter = RateLimiter(rate=1, burst=1, clock=self.clock, sleep=self.clock.sleep)
+        first = Wallet('first', rate_limiter=limiter)
+        second = Wallet('second', rate_limiter=limiter)
+
+        first.account_info()
+        second.account_info()
+        first.account_info()
+
+        self.assertEqual(self.clock.sleeps, [1.0])
+        stats = limiter.stats()
+        self.assertEqual(stats[limiter.key_for_token('first')]['waits'], 1)
+        self.assertEqual(stats[limiter.key_for_token('second')]['waits'], 0)
+
+    @responses.activate
+    def testPerClientOverride(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/request-external-payment'),
+                      body=json.dumps({'status': 'success'}), content_type='application/json')
+        limiter = RateLimiter(rate=100, clock=self.clock, sleep=self.clock.sleep)
+        limiter.set_limit(limiter.key_for_client(instance_id='slow'), rate=1, burst=1)
+
+        api = ExternalPayment(instance_id='slow', rate_limiter=limiter)
+        api.request({})
+        api.request({})
+
+        self.assertEqual(self.clock.sleeps, [1.0])
+
+    def testMaxInFlight(self):
+        limiter = RateLimiter(max_in_flight=2)
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def work():
+            with limiter.acquire('key'):
+                with lock:
+                    state['current'] += 1
+                    state['peak'] = max(state['peak'], state['current'])
+                time.sleep(0.01)
+                with lock:
+                    state['current'] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(limiter.stats()['key']['in_flight'], 0)
+
+    @unittest.skipIf(asyncio is None, 'asyncio client requires Python 3.6+')
+    def testAsyncAndThreadsShareSlots(self):
+        limiter = RateLimiter(max_in_flight=1)
+        loop = asyncio.new_event_loop()
+        order = []
+
+        def hold():
+            with limiter.acquire('key'):
+                order.append('thread')
+                time.sleep(0.05)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        while not order:
+            time.sleep(0.001)
+        loop.run_until_complete(acquire_rate_limit(limiter, 'key'))
+        order.append('task')
+        limiter.release('key')
+        thread.join()
+        loop.close()
+
+        self.assertEqual(order, ['thread', 'task'])
+        self.assertEqual(limiter.limit('key').in_flight.in_flight, 0)
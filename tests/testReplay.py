@@ -0,0 +1,103 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+import responses
+
+from yandex_money import exceptions
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.replay import (RecordingTransport, ReplayTransport, Replayer,
+                                 read_recording)
+from yandex_money.transport import RequestsTransport
+from tests import add_response
+
+
+class ReplayTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        ExternalPayment.zero_cache()
+
+    @responses.activate
+    def record(self, name):
+        add_response('/api/account-info', 200, {'account': '4100', 'balance': 10})
+        add_response('/oauth/token', 200, {'access_token': 'secret-token'})
+        add_response('/api/request-payment', 200, {'status': 'refused',
+                                                   'error': 'not_enough_funds'})
+        add_response('/api/process-external-payment', 200, {'status': 'refused',
+                                                            'error': 'illegal_params'})
+        add_response('/api/operation-history', 503, {})
+        path = os.path.join(self.directory, name)
+        transport = RecordingTransport(path, RequestsTransport())
+        wallet = Wallet('token', transport=transport)
+
+        wallet.account_info()
+        Wallet.get_access_token('client', 'oauth-code', 'https://example.com/',
+                                client_secret='very-secret', transport=transport)
+        wallet.request_payment({'pattern_id': 'p2p', 'to': '4100', 'amount': '1'})
+        self.assertRaises(exceptions.YandexPaymentError,
+                          ExternalPayment(instance_id='1', transport=transport).process,
+                          {'request_id': '1'})
+        self.assertRaises(requests.HTTPError, wallet.operation_history, {'records': 3})
+        transport.close()
+        return path
+
+    def testRecordingIsRedacted(self):
+        path = self.record('traffic.jsonl.gz')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')  # gzip
+
+        entries = read_recording(path)
+
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(entries[0]['status'], 200)
+        self.assertNotIn('very-secret', json.dumps(entries))
+        self.assertNotIn('oauth-code', json.dumps(entries))
+        self.assertNotIn('secret-token', json.dumps(entries))
+        self.assertIn('pattern_id=p2p', entries[2]['body'])
+
+    def testReplayTransport(self):
+        wallet = Wallet('token', transport=ReplayTransport(self.record('traffic.jsonl')))
+
+        self.assertEqual(wallet.account_info().balance, 10)
+        self.assertEqual(wallet.account_info().balance, 10)
+        self.assertRaises(requests.HTTPError, wallet.operation_history, {'records': 3})
+        self.assertRaises(LookupError, wallet.get_aux_token, ['account-info'])
+
+    def testReplayer(self):
+        result = Replayer(self.record('traffic.jsonl'), concurrency=3).run(loops=4)
+
+        self.assertEqual(result['calls'], 20)
+        self.assertEqual(result['outcomes'], {'ok': 12, 'HTTPError': 4,
+                                              'YandexPaymentError:illegal_params': 4})
+
+    def testSpeed(self):
+        slept = []
+        entries = [{'t': 0, 'url': 'https://money.yandex.ru/api/account-info', 'body': '',
+                    'status': 200, 'content': '{}', 'elapsed': 0.5},
+                   {'t': 2.0, 'url': 'https://money.yandex.ru/api/account-info', 'body': '',
+                    'status': 200, 'content': '{}', 'elapsed': 0.5}]
+
+        Replayer(entries, speed=2.0, clock=lambda: 0, sleep=slept.append).run()
+
+        self.assertEqual(sorted(slept), [0.25, 0.25, 1.0])
+
+    def testUnexpectedErrorsAreCounted(self):
+        entries = [{'t': 0, 'url': 'https://money.yandex.ru/api/account-info', 'body': '',
+                    'status': 200, 'content': '{}', 'elapsed': 0},
+                   {'t': 0, 'url': 'https://money.yandex.ru/api/operation-history',
+                    'body': '', 'status': 200, 'content': 'not json', 'elapsed': 0}]
+
+        result = Replayer(entries, concurrency=2).run(loops=3)
+
+        self.assertEqual(result['calls'], 6)
+        self.assertEqual(result['outcomes'].pop('ok'), 3)
+        self.assertEqual(list(result['outcomes'].values()), [3])
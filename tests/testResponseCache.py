@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import unittest
+
+import responses
+
+from yandex_money.api import Wallet
+from yandex_money.cache import ResponseCache
+from yandex_money.models import AccountInfo
+from tests import FakeClock, add_response
+
+
+class ResponseCacheTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(ttl=5, maxsize=3, clock=self.clock)
+        self.api = Wallet('token', response_cache=self.cache)
+
+    @responses.activate
+    def testTtl(self):
+        add_response('/api/account-info', 200, {'balance': 1})
+
+        self.assertEqual(self.api.account_info().balance, 1)
+        info = self.api.account_info()
+        self.assertIsInstance(info, AccountInfo)
+        self.assertEqual(len(responses.calls), 1)
+
+        self.clock.now = 6
+        self.api.account_info()
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 2, 'size': 1})
+
+    @responses.activate
+    def testKeyedByTokenAndParams(self):
+        add_response('/api/account-info', 200, {'balance': 1})
+        add_response('/api/operation-history', 200, {'operations': [], 'next_record': '3'})
+
+        self.api.account_info()
+        Wallet('other', response_cache=self.cache).account_info()
+        self.api.operation_history({'records': 3})
+        self.api.operation_history({'records': 3})
+        self.api.operation_history({'records': 4})
+
+        self.assertEqual(len(responses.calls), 4)
+
+    def testNonAsciiOptions(self):
+        key = ResponseCache.make_key('token', '/api/operation-history', {'label': 'заказ 1'})
+
+        self.assertEqual(key[2], (('label', 'заказ 1'),))
+
+    @responses.activate
+    def testLastHistoryPageIsNotCached(self):
+        add_response('/api/operation-history', 200, {'operations': []})
+
+        self.api.operation_history({'records': 3})
+        self.api.operation_history({'records': 3})
+
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def testInvalidatedByPayment(self):
+        add_response('/api/account-info', 200, {'balance': 1})
+        add_response('/api/process-payment', 200, {'status': 'success'})
+
+        self.api.account_info()
+        Wallet('other', response_cache=self.cache).account_info()
+        self.api.process_payment({'request_id': '1'})
+        self.api.account_info()
+
+        self.assertEqual(len(responses.calls), 4)
+        self.assertEqual(len(self.cache), 2)
+
+    def testLruEviction(self):
+        for index in range(4):
+            self.cache.set(('token', str(index), ()), {'index': index})
+        self.cache.get(('token', '1', ()))
+        self.cache.set(('token', '4', ()), {'index': 4})
+
+        self.assertIsNone(self.cache.get(('token', '0', ())))
+        self.assertIsNone(self.cache.get(('token', '2', ())))
+        self.assertEqual(self.cache.get(('token', '1', ())), {'index': 1})
+        self.assertEqual(len(self.cache), 3)
+
+    def testReturnsCopies(self):
+        key = ('token', '/api/account-info', ())
+        self.cache.set(key, {'balance': 1})
+        self.cache.get(key)['balance'] = 2
+        self.assertEqual(self.cache.get(key), {'balance': 1})
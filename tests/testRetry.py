@@ -0,0 +1,86 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import re
+import unittest
+
+import requests
+import responses
+
+from yandex_money.api import Wallet
+from yandex_money.retry import RetryPolicy, RetryTransport
+from tests import FakeClock, add_response
+
+
+class RetryTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.policy = RetryPolicy(max_attempts=3, backoff=1, jitter=False,
+                                  max_elapsed=10)
+        self.api = Wallet('token', transport=RetryTransport(
+            policy=self.policy, sleep=self.clock.sleep, clock=self.clock))
+
+    @responses.activate
+    def testRetryIdempotentServerError(self):
+        add_response('/api/account-info', 503, {})
+        add_response('/api/account-info', 200, {'balance': 1})
+
+        self.assertEqual(self.api.account_info().balance, 1)
+        self.assertEqual(self.clock.sleeps, [1])
+
+    @responses.activate
+    def testGiveUpAfterMaxAttempts(self):
+        add_response('/api/account-info', 503, {})
+
+        self.assertRaises(requests.HTTPError, self.api.account_info)
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(self.clock.sleeps, [1, 2])
+
+    @responses.activate
+    def testNoRetryWithoutRequestId(self):
+        add_response('/api/request-payment', 503, {})
+
+        self.assertRaises(requests.HTTPError, self.api.request_payment, {'to': '1'})
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def testRetryConnectionError(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/process-payment'),
+                      body=requests.ConnectionError('reset'))
+        add_response('/api/process-payment', 200, {'status': 'success'})
+
+        response = self.api.process_payment({'request_id': '1'})
+        self.assertEqual(response.status, 'success')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def testPollInProgress(self):
+        add_response('/api/process-payment', 200,
+                     {'status': 'in_progress', 'next_retry': 3000})
+        add_response('/api/process-payment', 200,
+                     {'status': 'in_progress', 'next_retry': 5000})
+        add_response('/api/process-payment', 200, {'status': 'success'})
+
+        response = self.api.process_payment({'request_id': '1'})
+        self.assertEqual(response.status, 'success')
+        self.assertEqual(self.clock.sleeps, [3, 5])
+
+    @responses.activate
+    def testRetryableRefusal(self):
+        add_response('/api/process-payment', 200,
+                     {'status': 'refused', 'error': 'technical_error', 'next_retry': 2000})
+        add_response('/api/process-payment', 200, {'status': 'refused',
+                                                   'error': 'not_enough_funds'})
+
+        response = self.api.process_payment({'request_id': '1'})
+        self.assertEqual(response.error, 'not_enough_funds')
+        self.assertEqual(self.clock.sleeps, [2])
+
+    @responses.activate
+    def testMaxElapsed(self):
+        add_response('/api/process-payment', 200,
+                     {'status': 'in_progress', 'next_retry': 6000})
+
+        response = self.api.process_payment({'request_id': '1'})
+        self.assertEqual(response.status, 'in_progress')
+        self.assertEqual(self.clock.sleeps, [6])
@@ -0,0 +1,117 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import responses
+from six.moves.urllib.parse import parse_qsl
+
+from yandex_money.api import Wallet
+from yandex_money.sync import HistorySync, OperationStore, to_utc
+from tests import add_callback
+
+
+class FakeHistory(object):
+    def __init__(self):
+        self.operations = []  # newest first, like the API
+        self.requests = []
+        self.fail_at = None
+
+    def add(self, count):
+        start = len(self.operations)
+        for index in range(start, start + count):
+            self.operations.insert(0, {
+                'operation_id': str(index),
+                'datetime': '2015-01-01T{:02d}:{:02d}:00.000+03:00'.format(
+                    index // 60 + 3, index % 60),
+                'label': 'even' if index % 2 == 0 else 'odd',
+                'direction': 'in' if index % 3 == 0 else 'out',
+                'title': 'Operation {}'.format(index),
+            })
+
+    def __call__(self, request):
+        payload = dict(parse_qsl(request.body))
+        self.requests.append(payload)
+        if self.fail_at is not None and len(self.requests) == self.fail_at:
+            return 500, {}, '{}'
+        operations = self.operations
+        if 'from' in payload:
+            operations = [operation for operation in operations
+                          if to_utc(operation['datetime']) >= payload['from']]
+        start = int(payload.get('start_record', 0))
+        end = start + int(payload['records'])
+        body = {'operations': operations[start:end]}
+        if end < len(operations):
+            body['next_record'] = str(end)
+        return 200, {}, json.dumps(body)
+
+
+class SyncTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.history = FakeHistory()
+        add_callback('/api/operation-history', self.history)
+        self.path = os.path.join(self.directory, 'history.sqlite')
+        self.store = OperationStore(self.path)
+        self.sync = HistorySync(Wallet('token'), self.store, page_size=10)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def testToUtc(self):
+        self.assertEqual(to_utc('2015-01-01T03:00:00.5+03:00'), '2015-01-01T00:00:00.500000Z')
+        self.assertEqual(to_utc('2015-01-01T00:00:00Z'), '2015-01-01T00:00:00.000000Z')
+
+    @responses.activate
+    def testIncremental(self):
+        self.history.add(25)
+        self.assertEqual(self.sync.sync(), 25)
+        self.assertEqual(len(self.history.requests), 3)
+        self.assertEqual(self.sync.checkpoint, '2015-01-01T00:24:00.000000Z')
+
+        self.history.add(3)
+        del self.history.requests[:]
+        self.sync.sync()
+
+        self.assertEqual(len(self.history.requests), 1)
+        self.assertEqual(self.history.requests[0]['from'], '2015-01-01T00:24:00.000000Z')
+        self.assertEqual(len(self.store), 28)
+
+    @responses.activate
+    def testResume(self):
+        self.history.add(25)
+        self.history.fail_at = 2
+        self.assertRaises(Exception, self.sync.sync)
+        self.assertEqual(len(self.store), 10)
+        self.assertIsNone(self.sync.checkpoint)
+
+        self.history.fail_at = None
+        self.sync.sync()
+
+        self.assertEqual(self.history.requests[-2]['start_record'], '10')
+        self.assertEqual(len(self.store), 25)
+        self.assertEqual(self.sync.checkpoint, '2015-01-01T00:24:00.000000Z')
+
+    @responses.activate
+    def testLocalQueries(self):
+        self.history.add(25)
+        self.sync.sync()
+        calls = len(responses.calls)
+
+        store = OperationStore(self.path)
+        even = store.query(label='even')
+        window = store.query(since='2015-01-01T03:05:00+03:00',
+                             until='2015-01-01T00:10:00Z', direction='in')
+        latest = store.query(limit=2)
+        store.close()
+
+        self.assertEqual(len(even), 13)
+        self.assertEqual([operation.operation_id for operation in window], ['9', '6'])
+        self.assertEqual([operation['operation_id'] for operation in latest], ['24', '23'])
+        self.assertEqual(self.store.get('7').title, 'Operation 7')
+        self.assertEqual(len(responses.calls), calls)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+from requests.models import RequestEncodingMixin
+import responses
+from six.moves.urllib.parse import parse_qsl
+
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.cache import ResponseCache
+from yandex_money.templates import RequestTemplate, encode_form
+
+
+class TemplatesTestSuite(unittest.TestCase):
+    def tearDown(self):
+        ExternalPayment.zero_cache()
+
+    def testEncodesLikeRequests(self):
+        fields = {'message': 'тест & co', 'amount': 10.5, 'test_payment': True,
+                  'skipped': None, 'scope': ['a', 'b']}
+
+        self.assertEqual(sorted(encode_form(fields).split('&')),
+                         sorted(RequestEncodingMixin._encode_params(fields).split('&')))
+
+    def testConstantFieldsWin(self):
+        template = RequestTemplate('https://example.com/api/x',
+                                   fields={'instance_id': 'abc', 'pattern_id': 'p2p'})
+
+        body = dict(parse_qsl(template.body({'instance_id': 'other', 'amount': 1})))
+
+        self.assertEqual(body, {'instance_id': 'abc', 'pattern_id': 'p2p', 'amount': '1'})
+        self.assertEqual(template.body(), template.body({}))
+
+    def testSendRequestKeepsCallerHeaders(self):
+        headers = {'Authorization': 'Bearer token'}
+        with responses.RequestsMock() as mock:
+            mock.add(responses.POST, 'https://money.yandex.ru/api/revoke', body='{}')
+            Wallet.send_request('/api/revoke', headers, {'revoke-all': False})
+
+            self.assertEqual(headers, {'Authorization': 'Bearer token'})
+            self.assertEqual(mock.calls[0].request.headers['User-Agent'],
+                             'Yandex.Money.SDK/Python')
+
+    @responses.activate
+    def testWalletTemplate(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/request-payment'),
+                      body=json.dumps({'status': 'success', 'request_id': '1'}),
+                      content_type='application/json')
+        wallet = Wallet('token')
+        wallet.prepare('/api/request-payment', pattern_id='p2p', test_payment=True)
+
+        wallet.request_payment({'to': '4100', 'amount': '1.00'})
+        wallet.request_payment({'to': '4101', 'amount': '2.00'})
+
+        template = wallet._template('/api/request-payment')
+        self.assertIs(wallet._template('/api/request-payment'), template)
+        self.assertEqual(template.headers['Authorization'], 'Bearer token')
+        request = responses.calls[1].request
+        self.assertEqual(dict(parse_qsl(request.body)),
+                         {'pattern_id': 'p2p', 'test_payment': 'True',
+                          'to': '4101', 'amount': '2.00'})
+        self.assertEqual(request.headers['Content-Type'],
+                         'application/x-www-form-urlencoded')
+
+        wallet.access_token = 'new'
+        self.assertEqual(wallet._template('/api/request-payment').headers['Authorization'],
+                         'Bearer new')
+
+    def testTokenChangeWhileBuildingTemplate(self):
+        wallet = Wallet('old')
+
+        class Fields(dict):
+            def get(self, url):
+                wallet.access_token = 'new'  # refreshed by another thread
+                return None
+
+        wallet._prepared_fields = Fields()
+        wallet._template('/api/account-info')
+        wallet._prepared_fields = {}
+
+        self.assertEqual(wallet._template('/api/account-info').headers['Authorization'],
+                         'Bearer new')
+
+    def testPreparedFieldsArePartOfCacheKey(self):
+        cache = ResponseCache()
+        wallet, prepared = Wallet('token'), Wallet('token')
+        prepared.prepare('/api/operation-history', type='deposition')
+
+        self.assertNotEqual(wallet._cache_key(cache, '/api/operation-history', {}),
+                            prepared._cache_key(cache, '/api/operation-history', {}))
+
+    @responses.activate
+    def testExternalPaymentDoesNotCopyOptions(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/request-external-payment'),
+                      body=json.dumps({'status': 'success', 'request_id': '1'}),
+                      content_type='application/json')
+        api = ExternalPayment(instance_id='123')
+        options = {'pattern_id': 'p2p', 'amount': 1}
+
+        api.request(options)
+
+        self.assertEqual(options, {'pattern_id': 'p2p', 'amount': 1})
+        self.assertEqual(dict(parse_qsl(responses.calls[0].request.body))['instance_id'], '123')
@@ -0,0 +1,121 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import threading
+import time
+import unittest
+
+import responses
+
+from yandex_money import exceptions
+from yandex_money.api import Wallet
+from yandex_money.storage import MemoryStore
+from yandex_money.tokens import TokenManager
+from tests import add_callback
+
+
+class TokensTestSuite(unittest.TestCase):
+    def testAuthHeaderFollowsToken(self):
+        wallet = Wallet('first')
+        self.assertEqual(wallet._auth_headers, {'Authorization': 'Bearer first'})
+        wallet.access_token = 'second'
+        self.assertEqual(wallet._auth_headers, {'Authorization': 'Bearer second'})
+
+    @responses.activate
+    def testAuxTokenPool(self):
+        issued = []
+
+        def token_aux(request):
+            issued.append(request.headers['Authorization'])
+            return 200, {}, json.dumps({'aux_token': 'aux{}'.format(len(issued))})
+
+        add_callback('/api/token-aux', token_aux)
+        manager = TokenManager('main')
+
+        first = manager.aux_wallet(['account-info', 'operation-history'])
+        second = manager.aux_wallet(['operation-history', 'account-info'])
+        third = manager.aux_token(['account-info'])
+
+        self.assertIs(first, second)
+        self.assertEqual(first.access_token, 'aux1')
+        self.assertEqual(third, 'aux2')
+        self.assertEqual(issued, ['Bearer main', 'Bearer main'])
+
+    @responses.activate
+    def testCoalescedRefresh(self):
+        def account_info(request):
+            if request.headers['Authorization'] == 'Bearer fresh':
+                return 200, {}, json.dumps({'balance': 1})
+            return 401, {}, '{}'
+
+        add_callback('/api/account-info', account_info)
+        refreshed = []
+
+        def refresh(stale_token):
+            time.sleep(0.02)
+            refreshed.append(stale_token)
+            return 'fresh'
+
+        events = []
+        manager = TokenManager('stale', refresh=refresh, on_refresh=events.append)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            manager.call(lambda wallet: wallet.account_info()).balance)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(refreshed, ['stale'])
+        self.assertEqual(events, ['fresh'])
+        self.assertEqual(manager.access_token, 'fresh')
+
+    @responses.activate
+    def testTokenErrorWithoutRefresh(self):
+        add_callback('/api/account-info', lambda request: (401, {}, '{}'))
+        manager = TokenManager('token')
+        self.assertRaises(exceptions.TokenError, manager.call,
+                          lambda wallet: wallet.account_info())
+
+    @responses.activate
+    def testShutdownRevokesInBatches(self):
+        counter = iter(range(100))
+        revoked = []
+        add_callback('/api/token-aux', lambda request: (
+            200, {}, json.dumps({'aux_token': 'aux{}'.format(next(counter))})))
+
+        def revoke(request):
+            revoked.append(request.headers['Authorization'])
+            return 200, {}, '{}'
+
+        add_callback('/api/revoke', revoke)
+        manager = TokenManager('main', revoke_batch_size=2)
+        for scope in ('a', 'b', 'c'):
+            manager.aux_wallet([scope])
+
+        self.assertEqual(manager.shutdown(), [])
+        self.assertEqual(sorted(revoked), ['Bearer aux0', 'Bearer aux1', 'Bearer aux2'])
+
+    @responses.activate
+    def testTokenSharedThroughStore(self):
+        add_callback('/api/account-info', lambda request: (
+            (200, {}, json.dumps({'balance': 1}))
+            if request.headers['Authorization'] == 'Bearer fresh' else (401, {}, '{}')))
+        store = MemoryStore()
+        refreshed = []
+
+        def refresh(stale_token):
+            refreshed.append(stale_token)
+            return 'fresh'
+
+        first = TokenManager('stale', refresh=refresh, store=store, store_key='wallet')
+        second = TokenManager('stale', refresh=refresh, store=store, store_key='wallet')
+
+        self.assertEqual(first.call(lambda wallet: wallet.account_info()).balance, 1)
+        self.assertEqual(second.call(lambda wallet: wallet.account_info()).balance, 1)
+        self.assertEqual(refreshed, ['stale'])
+        self.assertEqual(second.refreshes, 0)
+        self.assertEqual(TokenManager('stale', store=store, store_key='wallet').access_token,
+                         'fresh')
@@ -0,0 +1,65 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import json
+import re
+import unittest
+
+import responses
+
+from yandex_money.api import Wallet, ExternalPayment
+from yandex_money.transport import (RequestsTransport, SessionTransport,
+                                    get_default_transport)
+
+
+class RecordingTransport(RequestsTransport):
+    def __init__(self):
+        super(RecordingTransport, self).__init__()
+        self.urls = []
+
+    def post(self, url, headers=None, data=None):
+        self.urls.append(url)
+        return super(RecordingTransport, self).post(url, headers, data)
+
+
+class TransportTestSuite(unittest.TestCase):
+    def setUp(self):
+        responses.add(responses.POST, re.compile('https?://.*/api/account-info'),
+                      body=json.dumps({'account': '4100', 'balance': 1}),
+                      content_type='application/json')
+
+    def tearDown(self):
+        ExternalPayment.zero_cache()
+
+    def testDefaultTransport(self):
+        self.assertIsInstance(get_default_transport(), RequestsTransport)
+        self.assertIs(Wallet('token').get_transport(), get_default_transport())
+
+    @responses.activate
+    def testSessionTransportReusesSession(self):
+        transport = SessionTransport(pool_maxsize=4, timeout=5)
+        api = Wallet('token', transport=transport)
+
+        self.assertEqual(api.account_info().balance, 1)
+        session = transport.session
+        self.assertEqual(api.account_info().account, '4100')
+        self.assertIs(transport.session, session)
+        self.assertEqual(len(responses.calls), 2)
+
+        transport.close()
+        self.assertIsNone(transport._session)
+
+    @responses.activate
+    def testInjectedTransportIsShared(self):
+        transport = RecordingTransport()
+        responses.add(responses.POST, re.compile('https?://.*/api/instance-id'),
+                      body=json.dumps({'status': 'success', 'instance_id': '1'}),
+                      content_type='application/json')
+
+        Wallet('token', transport=transport).account_info()
+        self.assertEqual(ExternalPayment('client', transport=transport).instance_id, '1')
+
+        self.assertEqual(transport.urls, [
+            'https://money.yandex.ru/api/account-info',
+            'https://money.yandex.ru/api/instance-id',
+        ])
@@ -0,0 +1,379 @@
+"""asyncio counterparts of Wallet and ExternalPayment (Python 3.6+).
+
+Every API method of AsyncWallet and AsyncExternalPayment is a coroutine;
+results and exceptions are the same as for the blocking classes.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import asyncio
+import time
+import weakref
+
+from requests.exceptions import HTTPError
+from six.moves.urllib.parse import urlencode
+
+from . import exceptions, instrumentation
+from .api import Wallet, ExternalPayment
+from .breaker import BreakerTransport
+from .jsonutil import loads
+from .models import model_for_url
+from .retry import RetryPolicy
+from .transport import DEFAULT_TIMEOUT
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+    _TRANSIENT_ERRORS = (OSError, asyncio.TimeoutError)
+else:
+    _TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+__all__ = ['AsyncWallet', 'AsyncExternalPayment', 'AiohttpTransport',
+           'AsyncRetryTransport', 'AsyncBreakerTransport', 'acquire_rate_limit',
+           'get_default_async_transport', 'set_default_async_transport']
+
+
+class _Response(object):
+    """Fully read HTTP response exposing the part of the requests.Response
+    interface used by BasePayment.process_result."""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise HTTPError('{} Error for url: {}'.format(self.status_code, self.url),
+                            response=self)
+
+
+def _encode_body(data):
+    # same form encoding as requests: keys with None values are dropped
+    if not data:
+        return ''
+    if isinstance(data, (str, bytes)):  # already encoded by a RequestTemplate
+        return data
+    return urlencode([(key, value) for key, value in data.items()
+                      if value is not None], doseq=True)
+
+
+class AiohttpTransport(object):
+    """Keep-alive transport backed by a pooled aiohttp.ClientSession.
+
+    A session is created on first use in each event loop, since it can only
+    be used on the loop it was created in (e.g. one asyncio.run() per call).
+    ``timeout`` is a total in seconds or a (connect, read) tuple.
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, timeout=DEFAULT_TIMEOUT,
+                 session=None):
+        if aiohttp is None:
+            raise ImportError('AiohttpTransport requires the aiohttp package')
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session = session  # used as is on every loop when given
+        self._sessions = {}  # event loop -> ClientSession
+
+    @property
+    def session(self):
+        if self._session is not None and not self._session.closed:
+            return self._session
+        loop = asyncio.get_event_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            for other in [other for other in self._sessions if other.is_closed()]:
+                del self._sessions[other]
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host)
+            if isinstance(self.timeout, tuple):
+                connect, read = self.timeout
+                timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+            else:
+                timeout = aiohttp.ClientTimeout(total=self.timeout)
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector,
+                                                                   timeout=timeout)
+        return session
+
+    async def post(self, url, headers=None, data=None):
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        async with self.session.post(url, headers=headers,
+                                     data=_encode_body(data)) as response:
+            content = await response.read()
+            return _Response(url, response.status, content)
+
+    async def close(self):
+        """Close the session given or created for the running loop."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        session = self._sessions.pop(asyncio.get_event_loop(), None)
+        if session is not None:
+            await session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncRetryTransport(object):
+    """Async counterpart of retry.RetryTransport."""
+
+    def __init__(self, transport=None, policy=None, sleep=asyncio.sleep,
+                 clock=time.time):
+        self.transport = transport or get_default_async_transport()
+        self.policy = policy or RetryPolicy()
+        self.sleep = sleep
+        self.clock = clock
+
+    async def post(self, url, headers=None, data=None):
+        started = self.clock()
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.post(url, headers=headers, data=data)
+            except _TRANSIENT_ERRORS as error:
+                connect_failed = aiohttp is not None and \
+                    isinstance(error, aiohttp.ClientConnectorError)
+                delay = self.policy.delay_for_error(attempt, url, data, connect_failed)
+                if delay is None or self.clock() - started + delay > self.policy.max_elapsed:
+                    raise
+                reason = type(error).__name__
+            else:
+                delay = self.policy.delay_for_response(attempt, url, data, response)
+                if delay is None or self.clock() - started + delay > self.policy.max_elapsed:
+                    return response
+                reason = self.policy.retry_reason(response)
+            instrumentation.retry(url, attempt, delay, reason)
+            await self.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        await self.transport.close()
+
+
+class AsyncBreakerTransport(BreakerTransport):
+    """Async counterpart of breaker.BreakerTransport."""
+
+    def __init__(self, transport=None, breakers=None, **breaker_options):
+        super(AsyncBreakerTransport, self).__init__(
+            transport or get_default_async_transport(), breakers, **breaker_options)
+
+    async def post(self, url, headers=None, data=None):
+        breaker = self.breaker(url)
+        probe = breaker.before_call()
+        started = breaker.clock()
+        try:
+            response = await self.transport.post(url, headers=headers, data=data)
+        except asyncio.CancelledError:  # an Exception before Python 3.8
+            breaker.release(probe)
+            raise
+        except Exception:
+            breaker.record(probe, True, breaker.clock() - started)
+            raise
+        except BaseException:
+            breaker.release(probe)
+            raise
+        breaker.record(probe, self.is_failure(response), breaker.clock() - started)
+        return response
+
+    async def close(self):
+        await self.transport.close()
+
+
+_default_async_transport = None
+
+
+def get_default_async_transport():
+    global _default_async_transport
+    if _default_async_transport is None:
+        _default_async_transport = AiohttpTransport()
+    return _default_async_transport
+
+
+def set_default_async_transport(transport):
+    global _default_async_transport
+    _default_async_transport = transport
+
+
+async def acquire_rate_limit(limiter, key):
+    """Async counterpart of RateLimiter.acquire(); pair with limiter.release(key)."""
+    limit = limiter.limit(key)
+    started = limiter.clock()
+    if limit.in_flight is not None:
+        future = asyncio.get_event_loop().create_future()
+        waiter = (asyncio.get_event_loop(), future)
+        if not limit.in_flight.try_acquire(waiter):
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    limiter.release(key)  # the slot was handed over already
+                else:
+                    limit.in_flight.cancel_wait(waiter)
+                raise
+    try:
+        if limit.bucket is not None:
+            delay = limit.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+    except BaseException:
+        limiter.release(key)
+        raise
+    limiter.waited(key, limit, limiter.clock() - started)
+
+
+class _AsyncPaymentMixin(object):
+    transport = None  # None means get_default_async_transport()
+
+    @classmethod
+    def get_transport(cls, transport=None):
+        return transport or cls.transport or get_default_async_transport()
+
+    @classmethod
+    async def _request(cls, full_url, headers, body, transport=None, model=None):
+        call = instrumentation.start(full_url, body)
+        response = None
+        try:
+            response = await cls.get_transport(transport).post(full_url, headers=headers,
+                                                               data=body)
+            result = cls.process_result(response, model or model_for_url(full_url))
+        except Exception as error:
+            if call is not None:
+                call.finish(response, error)
+            raise
+        if call is not None:
+            call.finish(response)
+        return result
+
+
+class AsyncWallet(_AsyncPaymentMixin, Wallet):
+    async def _send_authenticated_request(self, url, options=None):
+        if self.rate_limiter is None:
+            return await self._send_wallet_request(url, options)
+        key = self.rate_limit_key
+        await acquire_rate_limit(self.rate_limiter, key)
+        try:
+            return await self._send_wallet_request(url, options)
+        finally:
+            self.rate_limiter.release(key)
+
+    async def _send_cached_request(self, url, options=None, complete=None):
+        cache = self.response_cache
+        if cache is None:
+            return await self._send_authenticated_request(url, options)
+        key = self._cache_key(cache, url, options)
+        response = cache.get(key)
+        if response is None:
+            response = await self._send_authenticated_request(url, options)
+            if complete is None or complete(response):
+                cache.set(key, response)
+        return response
+
+    async def _send_payment_request(self, url, options=None):
+        try:
+            return await self._send_authenticated_request(url, options)
+        finally:
+            if self.response_cache is not None:
+                self.response_cache.invalidate(self.access_token)
+
+    async def iter_operation_history(self, options=None, prefetch=False):
+        options = dict(options or {})
+        page = await self.operation_history(options)
+        while True:
+            next_record = page.get('next_record')
+            if next_record is not None:
+                next_options = dict(options, start_record=next_record)
+                if prefetch:
+                    pending = asyncio.ensure_future(self.operation_history(next_options))
+            try:
+                for operation in page.get('operations', ()):
+                    yield operation
+            except GeneratorExit:
+                if next_record is not None and prefetch:
+                    pending.cancel()
+                raise
+            if next_record is None:
+                return
+            page = await pending if prefetch else await self.operation_history(next_options)
+
+
+class AsyncExternalPayment(_AsyncPaymentMixin, ExternalPayment):
+    @property
+    def instance_id(self):
+        raise TypeError('use "await get_instance_id()" on AsyncExternalPayment')
+
+    # event loop -> {client_id: in-flight fetch task}; a task can only be
+    # awaited on the loop that runs it
+    _instance_id_fetches = weakref.WeakKeyDictionary()
+
+    async def get_instance_id(self):
+        if self._instance_id is not None:
+            if callable(self._instance_id):
+                self._instance_id = self._instance_id()
+            return self._instance_id
+        instance_id = self.instance_id_cache.get(self.client_id)
+        if instance_id is not None:
+            return instance_id
+        fetches = self._instance_id_fetches.setdefault(asyncio.get_event_loop(), {})
+        fetch = fetches.get(self.client_id)
+        if fetch is None:
+            fetch = fetches[self.client_id] = asyncio.ensure_future(self._fetch_instance_id())
+            fetch.add_done_callback(lambda _: fetches.pop(self.client_id, None))
+        return await asyncio.shield(fetch)
+
+    async def _fetch_instance_id(self):
+        resp = await self._send_external_request("/api/instance-id", {
+            "client_id": self.client_id
+        })
+        instance_id = self._parse_instance_id(resp)
+        if instance_id is not None:
+            self.instance_id_cache.set(self.client_id, instance_id)
+        return instance_id
+
+    async def request(self, options):
+        return await self._send_external_request("/api/request-external-payment", options,
+                                                 await self.get_instance_id())
+
+    async def process(self, options):
+        return await self._send_external_request("/api/process-external-payment", options,
+                                                 await self.get_instance_id())
+
+    @property
+    def rate_limit_key(self):
+        if self.client_id is not None:
+            return self.rate_limiter.key_for_client(client_id=self.client_id)
+        if callable(self._instance_id):
+            self._instance_id = self._instance_id()
+        return self.rate_limiter.key_for_client(instance_id=self._instance_id)
+
+    async def _send_external_request(self, url, options, instance_id=None):
+        template = self._template(url, instance_id)
+        if self.rate_limiter is None:
+            return await self._send_template(template, options)
+        key = self.rate_limit_key
+        await acquire_rate_limit(self.rate_limiter, key)
+        try:
+            return await self._send_template(template, options)
+        finally:
+            self.rate_limiter.release(key)
+
+    async def get_status(self, options):
+        try:
+            response = await self.process(options)
+        except exceptions.YandexPaymentError:
+            return self._ERROR
+        return self.STATUSES.get(response['status'], self._ERROR)
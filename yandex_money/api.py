@@ -1,12 +1,19 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
-from copy import copy
+import threading
 
-from six.moves.urllib.parse import urlencode
-import requests
+try:
+    from urllib.parse import urlencode
+except ImportError:  # Python 2
+    from urllib import urlencode
 
-from . import exceptions
+from . import exceptions, instrumentation
+from .cache import InstanceIdCache
+from .jsonutil import decode_response
+from .models import Response, model_for_url
+from .templates import BASE_HEADERS, RequestTemplate
+from .transport import get_default_transport
 
 
 __all__ = ['Wallet', 'ExternalPayment']
@@ -15,19 +22,52 @@ __all__ = ['Wallet', 'ExternalPayment']
 class BasePayment(object):
     MONEY_URL = "https://money.yandex.ru"
     SP_MONEY_URL = "https://sp-money.yandex.ru"
+    transport = None  # None means transport.get_default_transport()
+    rate_limiter = None  # ratelimit.RateLimiter shared by instances
 
     @classmethod
-    def send_request(cls, url, headers=None, body=None):
-        if not headers:
-            headers = {}
-        headers['User-Agent'] = "Yandex.Money.SDK/Python"
+    def get_transport(cls, transport=None):
+        return transport or cls.transport or get_default_transport()
 
+    @classmethod
+    def send_request(cls, url, headers=None, body=None, transport=None):
+        headers = dict(BASE_HEADERS, **headers) if headers else BASE_HEADERS
         if not body:
             body = {}
         full_url = cls.MONEY_URL + url
-        return cls.process_result(
-            requests.post(full_url, headers=headers, data=body)
-        )
+        return cls._request(full_url, headers, body, transport)
+
+    @classmethod
+    def _request(cls, full_url, headers, body, transport=None, model=None):
+        call = instrumentation.start(full_url, body)
+        response = None
+        try:
+            response = cls.get_transport(transport).post(full_url, headers=headers,
+                                                         data=body)
+            result = cls.process_result(response, model or model_for_url(full_url))
+        except Exception as error:
+            if call is not None:
+                call.finish(response, error)
+            raise
+        if call is not None:
+            call.finish(response)
+        return result
+
+    def _send_template(self, template, options=None):
+        return self._request(template.url, template.headers, template.body(options),
+                             self.transport, template.model)
+
+    def prepare(self, url, **fields):
+        """Send ``fields`` with every request of this instance to ``url``.
+
+        The fields are form-encoded once, e.g.
+        ``wallet.prepare("/api/request-payment", pattern_id="p2p", test_payment=True)``.
+        """
+        self._prepared_fields = dict(self._prepared_fields, **{url: fields})
+        self._reset_templates()
+
+    def _reset_templates(self):
+        self._templates = {}
 
     @classmethod
     def _handler_errors(cls, result):
@@ -39,21 +79,92 @@ class BasePayment(object):
             raise exceptions.ScopeError
 
     @classmethod
-    def process_result(cls, result):
+    def process_result(cls, result, model=Response):
         cls._handler_errors(result)
-        return _AttribDict(result.json()) if result.ok else result.raise_for_status()
+        return model(decode_response(result)) if result.ok else result.raise_for_status()
 
 
 class Wallet(BasePayment):
-    def __init__(self, access_token):
+    response_cache = None  # cache.ResponseCache for read-only endpoints
+
+    def __init__(self, access_token, transport=None, response_cache=None,
+                 rate_limiter=None):
+        self._prepared_fields = {}  # url -> constant form fields, see prepare()
         self.access_token = access_token
+        if transport is not None:
+            self.transport = transport
+        if response_cache is not None:
+            self.response_cache = response_cache
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+
+    @property
+    def access_token(self):
+        return self._access_token
+
+    @access_token.setter
+    def access_token(self, access_token):
+        # formatted once per token instead of on every request; the headers and
+        # the templates built from them (url -> RequestTemplate) are replaced
+        # together so that a template never outlives its token
+        self._access_token = access_token
+        self._auth = ({"Authorization": "Bearer {}".format(access_token)}, {})
+
+    @property
+    def _auth_headers(self):
+        return self._auth[0]
+
+    def _reset_templates(self):
+        self._auth[1].clear()
+
+    @property
+    def rate_limit_key(self):
+        return self.rate_limiter.key_for_token(self.access_token)
 
     def _send_authenticated_request(self, url, options=None):
-        return self.send_request(
-            url, {"Authorization": "Bearer {}".format(self.access_token)}, options)
+        if self.rate_limiter is not None:
+            with self.rate_limiter.acquire(self.rate_limit_key):
+                return self._send_wallet_request(url, options)
+        return self._send_wallet_request(url, options)
+
+    def _template(self, url):
+        headers, templates = self._auth  # one snapshot, see access_token
+        template = templates.get(url)
+        if template is None:
+            template = templates[url] = RequestTemplate(
+                self.MONEY_URL + url, headers, self._prepared_fields.get(url))
+        return template
+
+    def _send_wallet_request(self, url, options=None):
+        return self._send_template(self._template(url), options)
+
+    def _cache_key(self, cache, url, options):
+        fields = self._prepared_fields.get(url)
+        if fields:
+            options = dict(fields, **(options or {}))
+        return cache.make_key(self.access_token, url, options)
+
+    def _send_cached_request(self, url, options=None, complete=None):
+        cache = self.response_cache
+        if cache is None:
+            return self._send_authenticated_request(url, options)
+        key = self._cache_key(cache, url, options)
+        response = cache.get(key)
+        if response is None:
+            response = self._send_authenticated_request(url, options)
+            if complete is None or complete(response):
+                cache.set(key, response)
+        return response
+
+    def _send_payment_request(self, url, options=None):
+        try:
+            return self._send_authenticated_request(url, options)
+        finally:
+            if self.response_cache is not None:
+                self.response_cache.invalidate(self.access_token)
 
     def account_info(self):
-        return self._send_authenticated_request("/api/account-info")
+        return self._send_cached_request("/api/account-info")
 
     def get_aux_token(self, scope):
         return self._send_authenticated_request("/api/token-aux", {
@@ -61,27 +172,48 @@ class Wallet(BasePayment):
         })
 
     def operation_history(self, options):
-        return self._send_authenticated_request("/api/operation-history",
-                                                options)
+        # only full pages are cached: the last one may still grow
+        return self._send_cached_request("/api/operation-history", options,
+                                         lambda page: 'next_record' in page)
+
+    def iter_operation_history(self, options=None, prefetch=False):
+        """Yield operations one by one, following next_record lazily.
+
+        Only the current page is held in memory. With ``prefetch=True`` the
+        next page is requested in a background thread while the current one
+        is being consumed.
+        """
+        options = dict(options or {})
+        page = self.operation_history(options)
+        while True:
+            next_record = page.get('next_record')
+            if next_record is not None:
+                next_options = dict(options, start_record=next_record)
+                if prefetch:
+                    pending = _Prefetch(self.operation_history, next_options)
+            for operation in page.get('operations', ()):
+                yield operation
+            if next_record is None:
+                return
+            page = pending.result() if prefetch else self.operation_history(next_options)
 
     def request_payment(self, options):
         return self._send_authenticated_request("/api/request-payment",
                                                 options)
 
     def process_payment(self, options):
-        return self._send_authenticated_request("/api/process-payment",
-                                                options)
+        return self._send_payment_request("/api/process-payment", options)
 
     def incoming_transfer_accept(self, operation_id, protection_code=None):
-        return self._send_authenticated_request(
+        return self._send_payment_request(
             "/api/incoming-transfer-accept", {
                 "operation_id": operation_id,
                 "protection_code": protection_code
             })
 
     def incoming_transfer_reject(self, operation_id):
-        return self._send_authenticated_request("/api/incoming-transfer-reject",
-                                                {"operation_id": operation_id})
+        return self._send_payment_request("/api/incoming-transfer-reject",
+                                          {"operation_id": operation_id})
 
     @classmethod
     def build_obtain_token_url(cls, client_id, redirect_uri, scope):
@@ -92,25 +224,26 @@ class Wallet(BasePayment):
 
     @classmethod
     def get_access_token(cls, client_id, code, redirect_uri,
-                         client_secret=None):
+                         client_secret=None, transport=None):
         full_url = cls.SP_MONEY_URL + "/oauth/token"
-        return cls.process_result(requests.post(full_url, data={
+        return cls._request(full_url, None, {
             "code": code,
             "client_id": client_id,
             "grant_type": "authorization_code",
             "redirect_uri": redirect_uri,
             "client_secret": client_secret
-        }))
+        }, transport)
 
     @classmethod
-    def revoke_token(cls, token, revoke_all=False):
+    def revoke_token(cls, token, revoke_all=False, transport=None):
         return cls.send_request("/api/revoke", body={
             "revoke-all": revoke_all
-        }, headers={"Authorization": "Bearer {}".format(token)})
+        }, headers={"Authorization": "Bearer {}".format(token)},
+            transport=transport)
 
 
 class ExternalPayment(BasePayment):
-    __cache = {}  # cross instances cache
+    instance_id_cache = InstanceIdCache()  # cross instances cache
     _SUCCESS = '1'
     _ERROR = '0'
     _PROGRESS = '-1'
@@ -120,55 +253,109 @@ class ExternalPayment(BasePayment):
         'in_progress': _PROGRESS,
     }
 
-    def __init__(self, client_id=None, instance_id=None):
+    def __init__(self, client_id=None, instance_id=None, transport=None,
+                 instance_id_cache=None, rate_limiter=None):
         if (client_id or instance_id) is None:
             raise TypeError('instance required instance_id or client_id argument')
-        self.client_id, self.__instance_id = client_id, instance_id
+        self.client_id, self._instance_id = client_id, instance_id
+        self._prepared_fields = {}  # url -> constant form fields, see prepare()
+        self._templates = {}  # (url, instance_id) -> RequestTemplate
+        if transport is not None:
+            self.transport = transport
+        if instance_id_cache is not None:
+            self.instance_id_cache = instance_id_cache
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+
+    @property
+    def rate_limit_key(self):
+        if self.client_id is not None:
+            return self.rate_limiter.key_for_client(client_id=self.client_id)
+        return self.rate_limiter.key_for_client(instance_id=self.instance_id)
+
+    def _template(self, url, instance_id=None):
+        template = self._templates.get((url, instance_id))
+        if template is None:
+            fields = dict(self._prepared_fields.get(url) or {})
+            if instance_id is not None:
+                fields['instance_id'] = instance_id
+            template = self._templates[url, instance_id] = RequestTemplate(
+                self.MONEY_URL + url, fields=fields)
+        return template
+
+    def _send_external_request(self, url, options, instance_id=None):
+        template = self._template(url, instance_id)
+        if self.rate_limiter is not None:
+            with self.rate_limiter.acquire(self.rate_limit_key):
+                return self._send_template(template, options)
+        return self._send_template(template, options)
 
     @property
     def instance_id(self):
-        if self.__instance_id is not None:
-            if callable(self.__instance_id):
-                self.__instance_id = self.__instance_id()
-            return self.__instance_id
-        if 'instance_id' not in self.__cache:
-            resp = self.send_request("/api/instance-id", body={
-                "client_id": self.client_id
-            })
-            self.__cache['instance_id'] = resp['instance_id'] if resp['status'] == 'success' else None
-        return self.__cache['instance_id']
+        if self._instance_id is not None:
+            if callable(self._instance_id):
+                self._instance_id = self._instance_id()
+            return self._instance_id
+        return self.instance_id_cache.get_or_fetch(self.client_id,
+                                                   self._fetch_instance_id)
+
+    def _fetch_instance_id(self):
+        resp = self._send_external_request("/api/instance-id", {
+            "client_id": self.client_id
+        })
+        return self._parse_instance_id(resp)
+
+    @staticmethod
+    def _parse_instance_id(resp):
+        return resp['instance_id'] if resp['status'] == 'success' else None
 
     def request(self, options):
-        options = copy(options)
-        options['instance_id'] = self.instance_id
-        return self.send_request("/api/request-external-payment", body=options)
+        return self._send_external_request("/api/request-external-payment", options,
+                                           self.instance_id)
 
     def process(self, options):
-        options = copy(options)
-        options['instance_id'] = self.instance_id
-        return self.send_request("/api/process-external-payment", body=options)
+        return self._send_external_request("/api/process-external-payment", options,
+                                           self.instance_id)
 
     def get_status(self, options):
-        return self.STATUSES.get(self.process(options), self._ERROR)
+        try:
+            response = self.process(options)
+        except exceptions.YandexPaymentError:
+            return self._ERROR
+        return self.STATUSES.get(response['status'], self._ERROR)
 
     @classmethod
     def zero_cache(cls):
-        cls.__cache = {}
+        cls.instance_id_cache.clear()
 
     @classmethod
     def _handler_errors(cls, result):
         super(ExternalPayment, cls)._handler_errors(result)
-        result = result.json()
-        if result['status'] == 'refused':
-            raise exceptions.YandexPaymentError(result['error'])
-
-
-class _AttribDict(dict):
-    def __getattribute__(self, name):
-        if name in ['status', 'error', 'acs_uri', 'acs_params', 'money_source',
-                    'next_retry', 'invoice_id', 'instance_id', 'request_id',
-                    'contract_amount', 'title', 'balance', 'account', 'currency',
-                    'account_status', 'account_type', 'avatar', 'services_additional',
-                    'cards_linked', 'balance_details', 'operations', 'next_record']:
-            return super(_AttribDict, self).__getitem__(name)
-        return super(_AttribDict, self).__getattribute__(name)
\ No newline at end of file
+        if not result.ok:
+            return
+        body = decode_response(result)
+        if body['status'] == 'refused':
+            raise exceptions.payment_error(body.get('error'), body)
+
+
+class _Prefetch(object):
+    def __init__(self, func, *args):
+        self._result = self._error = None
+        self._thread = threading.Thread(target=self._run, args=(func, args))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, func, args):
+        try:
+            self._result = func(*args)
+        except Exception as error:
+            self._error = error
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+_AttribDict = Response  # backwards compatibility
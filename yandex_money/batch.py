@@ -0,0 +1,258 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import sys
+import threading
+import time
+
+import six
+from six.moves import queue
+
+from . import exceptions
+
+
+__all__ = ['BatchPaymentExecutor', 'PaymentResult', 'IncomingTransferProcessor',
+           'TransferResult', 'REJECT']
+
+_DONE = object()
+REJECT = 'reject'  # decision rejecting an incoming transfer
+
+
+class PaymentResult(object):
+    def __init__(self, index, spec, request=None, process=None, error=None):
+        self.index = index
+        self.spec = spec
+        self.request = request
+        self.process = process
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.process is not None \
+            and self.process['status'] == 'success'
+
+    def __repr__(self):
+        status = self.process['status'] if self.process is not None else None
+        return '<PaymentResult #{} ok={} status={} error={!r}>'.format(
+            self.index, self.ok, status, self.error)
+
+
+class _BatchRunner(object):
+    """Feeds items to ``max_workers`` threads calling ``execute(index, item)``."""
+    max_workers = 10
+
+    def run(self, specs):
+        """Yield a result per item of ``specs``, in completion order.
+
+        An exception raised by ``specs`` is re-raised once the items read
+        before it are done.
+        """
+        tasks = queue.Queue(maxsize=self.max_workers * 2)
+        results = queue.Queue()
+        stopped = threading.Event()
+        failure = []  # exc_info of an exception raised by specs
+
+        def feed():
+            try:
+                for task in enumerate(specs):
+                    while not stopped.is_set():
+                        try:
+                            tasks.put(task, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stopped.is_set():
+                        break
+            except Exception:
+                failure.append(sys.exc_info())
+            finally:
+                for _ in range(self.max_workers):
+                    tasks.put(_DONE)
+
+        def work():
+            while True:
+                task = tasks.get()
+                if task is _DONE:
+                    break
+                if not stopped.is_set():
+                    results.put(self.execute(*task))
+            results.put(_DONE)
+
+        threads = [threading.Thread(target=feed)]
+        threads.extend(threading.Thread(target=work) for _ in range(self.max_workers))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        running = self.max_workers
+        try:
+            while running:
+                result = results.get()
+                if result is _DONE:
+                    running -= 1
+                else:
+                    yield result
+            if failure:
+                six.reraise(*failure[0])
+        finally:
+            stopped.set()
+
+
+class BatchPaymentExecutor(_BatchRunner):
+    """Runs request_payment -> process_payment for many payments at once.
+
+    ``specs`` given to :meth:`run` are request_payment option dicts, or
+    ``(request_options, process_options)`` pairs. At most ``max_workers``
+    payments are in flight; ``in_progress`` results and refusals with a
+    retryable error code are re-processed after their ``next_retry``
+    (milliseconds) up to ``max_attempts`` times.
+    Share a pooled transport with the wallet to reuse connections.
+    """
+
+    def __init__(self, wallet, max_workers=10, max_attempts=10,
+                 default_retry=1000, sleep=time.sleep):
+        self.wallet = wallet
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.default_retry = default_retry
+        self.sleep = sleep
+
+    def execute(self, index, spec):
+        if isinstance(spec, tuple):
+            request_options, process_options = spec
+        else:
+            request_options, process_options = spec, {}
+        result = PaymentResult(index, spec)
+        try:
+            result.request = self.wallet.request_payment(request_options)
+            if result.request['status'] != 'success':
+                return result
+            options = dict(process_options, request_id=result.request['request_id'])
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    next_retry = result.process.get('next_retry') or self.default_retry
+                    self.sleep(int(next_retry) / 1000.0)
+                result.process = self.wallet.process_payment(options)
+                status = result.process['status']
+                if status != 'in_progress' and not (
+                        status == 'refused' and exceptions.is_retryable(result.process.get('error'))):
+                    break
+        except Exception as error:
+            result.error = error
+        return result
+
+
+class TransferResult(object):
+    """Outcome of one incoming-transfer decision.
+
+    ``outcome`` is 'accepted', 'rejected', 'wrong_code' (attempts are left),
+    'codes_exhausted' (no attempts left, the transfer goes back to the
+    sender), 'refused' (another error code) or 'error' (an exception).
+    """
+
+    def __init__(self, index, operation_id, action, response=None, error=None,
+                 attempts_available=None):
+        self.index = index
+        self.operation_id = operation_id
+        self.action = action
+        self.response = response
+        self.error = error
+        self.attempts_available = attempts_available
+
+    @property
+    def outcome(self):
+        if self.error is not None:
+            return 'error'
+        if self.response['status'] == 'success':
+            return 'accepted' if self.action == 'accept' else 'rejected'
+        if self.response.get('error') == exceptions.ILLEGAL_PARAM_PROTECTION_CODE:
+            return 'wrong_code' if self.attempts_available else 'codes_exhausted'
+        return 'refused'
+
+    @property
+    def ok(self):
+        return self.outcome in ('accepted', 'rejected')
+
+    def __repr__(self):
+        return '<TransferResult #{} {} {}>'.format(self.index, self.operation_id, self.outcome)
+
+
+class IncomingTransferProcessor(_BatchRunner):
+    """Accepts or rejects many incoming transfers at once.
+
+    :meth:`run` takes ``(operation_id, decision)`` pairs: a protection code,
+    a list of candidate codes tried in turn, None for transfers without
+    protection, or REJECT. Candidates are tried only while more than
+    ``keep_attempts`` attempts are left, and an operation whose attempts ran
+    out is not sent again. Decisions for one operation_id never overlap.
+    Retryable refusals are repeated after ``next_retry``, up to
+    ``max_attempts`` calls per decision.
+    """
+
+    def __init__(self, wallet, max_workers=10, keep_attempts=0, max_attempts=5,
+                 default_retry=1000, sleep=time.sleep):
+        self.wallet = wallet
+        self.max_workers = max_workers
+        self.keep_attempts = keep_attempts
+        self.max_attempts = max_attempts
+        self.default_retry = default_retry
+        self.sleep = sleep
+        self.attempts_available = {}  # operation_id -> protection code attempts left
+        self._locks = {}  # operation_id -> [lock, users]
+        self._lock = threading.Lock()
+
+    def _call(self, func, *args):
+        for _ in range(self.max_attempts - 1):
+            response = func(*args)
+            if not (response['status'] == 'refused'
+                    and exceptions.is_retryable(response.get('error'))):
+                return response
+            self.sleep(int(response.get('next_retry') or self.default_retry) / 1000.0)
+        return func(*args)
+
+    def _decide(self, index, operation_id, decision):
+        if decision == REJECT:
+            response = self._call(self.wallet.incoming_transfer_reject, operation_id)
+            return TransferResult(index, operation_id, 'reject', response)
+        codes = decision if isinstance(decision, (list, tuple)) else [decision]
+        result = None
+        for code in codes:
+            attempts = self.attempts_available.get(operation_id)
+            if attempts is not None and (attempts <= 0 or result is not None
+                                         and attempts <= self.keep_attempts):
+                break
+            response = self._call(self.wallet.incoming_transfer_accept, operation_id, code)
+            attempts = response.get('protection_code_attempts_available')
+            if attempts is not None:
+                self.attempts_available[operation_id] = int(attempts)
+            result = TransferResult(index, operation_id, 'accept', response,
+                                    attempts_available=self.attempts_available.get(operation_id))
+            if result.outcome != 'wrong_code':
+                break
+        if result is None:  # attempts already used up
+            result = TransferResult(index, operation_id, 'accept',
+                                    {'status': 'refused',
+                                     'error': exceptions.ILLEGAL_PARAM_PROTECTION_CODE,
+                                     'protection_code_attempts_available': 0},
+                                    attempts_available=0)
+        return result
+
+    def execute(self, index, item):
+        operation_id, decision = item
+        with self._lock:
+            entry = self._locks.setdefault(operation_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                result = self._decide(index, operation_id, decision)
+                if result.ok:
+                    self.attempts_available.pop(operation_id, None)
+                return result
+        except Exception as error:
+            return TransferResult(index, operation_id,
+                                  'reject' if decision == REJECT else 'accept', error=error)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[operation_id]
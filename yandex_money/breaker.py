@@ -0,0 +1,207 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from collections import deque
+import threading
+import time
+
+from . import exceptions
+from .transport import Transport, get_default_transport, url_path
+
+
+__all__ = ['CircuitBreaker', 'BreakerTransport', 'endpoint_group']
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+EXTERNAL_PATHS = frozenset([
+    '/api/instance-id',
+    '/api/request-external-payment',
+    '/api/process-external-payment',
+])
+
+
+def endpoint_group(url):
+    """'oauth' (SP_MONEY_URL), 'external' (ExternalPayment) or 'wallet'."""
+    path = url_path(url)
+    if path.startswith('/oauth/'):
+        return 'oauth'
+    if path in EXTERNAL_PATHS:
+        return 'external'
+    return 'wallet'
+
+
+class CircuitBreaker(object):
+    """Error-rate and latency circuit breaker for one endpoint group.
+
+    The outcomes of the last ``window`` calls are kept. Once ``min_calls``
+    of them are known and failures reach ``failure_rate`` of them, or calls
+    slower than ``slow_call`` seconds reach ``slow_call_rate``, the circuit
+    opens: calls raise CircuitOpenError for ``open_timeout`` seconds. After
+    that ``half_open_calls`` probes are let through; the circuit closes when
+    they all succeed and opens again on the first failed or slow probe.
+    """
+
+    def __init__(self, name='default', window=20, min_calls=10, failure_rate=0.5,
+                 slow_call=None, slow_call_rate=0.5, open_timeout=30.0,
+                 half_open_calls=1, on_state_change=None, clock=time.time):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.slow_call_rate = slow_call_rate
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.on_state_change = on_state_change
+        self.clock = clock
+        self.state = CLOSED
+        self.opened = 0  # times the circuit has tripped
+        self.rejected = 0  # calls failed fast
+        self._outcomes = deque(maxlen=window)  # (failed, slow) of closed-state calls
+        self._failures = self._slow = 0
+        self._opened_at = None
+        self._probes = self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = self.clock()
+            self.opened += 1
+        elif state == HALF_OPEN:
+            self._probes = self._probe_successes = 0
+        else:
+            self._outcomes.clear()
+            self._failures = self._slow = 0
+        return previous
+
+    def _notify(self, previous, state):
+        if self.on_state_change is not None and previous != state:
+            self.on_state_change(self.name, previous, state)
+
+    def before_call(self):
+        """Admit a call; returns True for half-open probes.
+
+        Raises CircuitOpenError when the call must not be sent.
+        """
+        previous = None
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_timeout - self.clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise exceptions.CircuitOpenError(self.name, remaining)
+                previous = self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self.rejected += 1
+                    raise exceptions.CircuitOpenError(self.name)
+                self._probes += 1
+                probe = True
+            else:
+                probe = False
+        if previous is not None:
+            self._notify(previous, HALF_OPEN)
+        return probe
+
+    def record(self, probe, failed, elapsed):
+        """Report the outcome of a call admitted by before_call()."""
+        slow = self.slow_call is not None and elapsed >= self.slow_call
+        previous = None
+        with self._lock:
+            if probe:
+                self._probes -= 1
+                if self.state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    previous = self._set_state(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        previous = self._set_state(CLOSED)
+            elif self.state == CLOSED:  # late results of calls sent before tripping are ignored
+                if len(self._outcomes) == self._outcomes.maxlen:
+                    old_failed, old_slow = self._outcomes[0]
+                    self._failures -= old_failed
+                    self._slow -= old_slow
+                self._outcomes.append((failed, slow))
+                self._failures += failed
+                self._slow += slow
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and (
+                        self._failures >= self.failure_rate * calls
+                        or self.slow_call is not None
+                        and self._slow >= self.slow_call_rate * calls):
+                    previous = self._set_state(OPEN)
+            state = self.state
+        if previous is not None:
+            self._notify(previous, state)
+
+    def release(self, probe):
+        """Give back a call admitted by before_call() that ended without an
+        outcome, e.g. because it was cancelled."""
+        if probe:
+            with self._lock:
+                if self.state == HALF_OPEN and self._probes > 0:
+                    self._probes -= 1
+
+    def reset(self):
+        with self._lock:
+            previous = self._set_state(CLOSED)
+        self._notify(previous, CLOSED)
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'calls': len(self._outcomes),
+                    'failures': self._failures, 'slow': self._slow,
+                    'opened': self.opened, 'rejected': self.rejected}
+
+
+class BreakerTransport(Transport):
+    """Wraps another transport with one CircuitBreaker per endpoint group.
+
+    Exceptions of the wrapped transport and 5xx answers count as failures;
+    interrupted calls (KeyboardInterrupt, cancellation) are not counted.
+    ``breaker_options`` are passed to every CircuitBreaker created; pass
+    ``breakers`` ({group: CircuitBreaker}) to configure groups separately.
+    """
+
+    def __init__(self, transport=None, breakers=None, **breaker_options):
+        self.transport = transport or get_default_transport()
+        self.breakers = dict(breakers or {})
+        self.breaker_options = breaker_options
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        group = endpoint_group(url)
+        breaker = self.breakers.get(group)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.get(group)
+                if breaker is None:
+                    breaker = self.breakers[group] = CircuitBreaker(group, **self.breaker_options)
+        return breaker
+
+    @staticmethod
+    def is_failure(response):
+        return response.status_code >= 500
+
+    def post(self, url, headers=None, data=None):
+        breaker = self.breaker(url)
+        probe = breaker.before_call()
+        started = breaker.clock()
+        try:
+            response = self.transport.post(url, headers=headers, data=data)
+        except Exception:
+            breaker.record(probe, True, breaker.clock() - started)
+            raise
+        except BaseException:  # interrupted, not an upstream failure
+            breaker.release(probe)
+            raise
+        breaker.record(probe, self.is_failure(response), breaker.clock() - started)
+        return response
+
+    def stats(self):
+        return dict((group, breaker.stats()) for group, breaker in self.breakers.items())
+
+    def close(self):
+        self.transport.close()
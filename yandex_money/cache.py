@@ -0,0 +1,152 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from collections import OrderedDict
+import threading
+import time
+
+from .storage import get_default_store
+
+
+__all__ = ['InstanceIdCache', 'ResponseCache']
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = self.error = None
+
+
+class InstanceIdCache(object):
+    """instance_id per client_id, fetched at most once at a time.
+
+    Concurrent lookups of a missing client_id wait for a single fetch
+    instead of each calling /api/instance-id. Values go to ``store``, or to
+    storage.get_default_store() when none is given; a FileStore, SqliteStore
+    or MmapStore keeps them across restarts and processes.
+    """
+    KEY = 'instance_id:{}'
+
+    def __init__(self, store=None):
+        self._store = store
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @property
+    def store(self):
+        return self._store if self._store is not None else get_default_store()
+
+    def get(self, client_id):
+        return self.store.get(self.KEY.format(client_id))
+
+    def set(self, client_id, instance_id):
+        self.store.set(self.KEY.format(client_id), instance_id)
+
+    def delete(self, client_id):
+        self.store.delete(self.KEY.format(client_id))
+
+    def clear(self):
+        store = self.store
+        if not hasattr(store, 'keys'):
+            return store.clear()
+        prefix = self.KEY.format('')
+        for key in store.keys():  # the store may be shared with other state
+            if key.startswith(prefix):
+                store.delete(key)
+
+    def get_or_fetch(self, client_id, fetch):
+        instance_id = self.get(client_id)
+        if instance_id is not None:
+            return instance_id
+
+        with self._lock:
+            flight = self._flights.get(client_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[client_id] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            if flight.value is not None:
+                self.set(client_id, flight.value)
+            return flight.value
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[client_id]
+            flight.event.set()
+
+
+class ResponseCache(object):
+    """Short-lived LRU cache for read-only Wallet responses.
+
+    Entries are keyed by a hash of the access token, the endpoint and the
+    request parameters, expire after ``ttl`` seconds and at most ``maxsize``
+    of them are kept. Wallet drops a token's entries after calls that move
+    money (process_payment, incoming transfers).
+    """
+
+    def __init__(self, ttl=5.0, maxsize=1024, clock=time.time):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_key(token):
+        import hashlib
+
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def make_key(cls, token, url, options=None):
+        # '{}' is text on Python 2 too, str() would fail on non-ASCII values
+        params = tuple(sorted((key, '{}'.format(value))
+                              for key, value in (options or {}).items()))
+        return cls.token_key(token), url, params
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries[key] = self._entries.pop(key)  # mark as recently used
+            self.hits += 1
+        value = entry[1]
+        return type(value)(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self.clock() + self.ttl, type(value)(value))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token=None):
+        """Drop entries of one access token, or everything."""
+        with self._lock:
+            if token is None:
+                self._entries.clear()
+                return
+            token_key = self.token_key(token)
+            for key in [key for key in self._entries if key[0] == token_key]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -2,7 +2,39 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
-__all__ = ['FormatError', 'ScopeError', 'TokenError', 'YandexPaymentError']
+__all__ = ['FormatError', 'ScopeError', 'TokenError', 'YandexPaymentError',
+           'CircuitOpenError', 'InsufficientFundsError', 'LimitExceededError',
+           'AccountBlockedError', 'ExtActionRequiredError', 'AuthorizationRejectError',
+           'MoneySourceNotAvailableError', 'PayeeNotFoundError', 'PaymentRefusedError',
+           'ContractNotFoundError', 'AlreadyRejectedError', 'InvalidParameterError',
+           'TechnicalError', 'payment_error', 'is_retryable', 'set_locale']
+
+# error codes of refused API calls
+ILLEGAL_PARAM_CLIENT_ID = 'illegal_param_client_id'
+CONTRACT_NOT_FOUND = 'contract_not_found'
+NOT_ENOUGH_FUNDS = 'not_enough_funds'
+LIMIT_EXCEEDED = 'limit_exceeded'
+MONEY_SOURCE_NOT_AVAILABLE = 'money_source_not_available'
+ILLEGAL_PARAM_CSC = 'illegal_param_csc'
+AUTHORIZATION_REJECT = 'authorization_reject'
+ACCOUNT_BLOCKED = 'account_blocked'
+ILLEGAL_PARAM_EXT_AUTH_SUCCESS_URI = 'illegal_param_ext_auth_success_uri'
+ILLEGAL_PARAM_EXT_AUTH_FAIL_URI = 'illegal_param_ext_auth_fail_uri'
+ILLEGAL_PARAM_PROTECTION_CODE = 'illegal_param_protection_code'
+ILLEGAL_PARAM_OPERATION_ID = 'illegal_param_operation_id'
+EXT_ACTION_REQUIRED = 'ext_action_required'
+ALREADY_REJECTED = 'already_rejected'
+ILLEGAL_PARAM_TO = 'illegal_param_to'
+ILLEGAL_PARAM_AMOUNT = 'illegal_param_amount'
+ILLEGAL_PARAM_AMOUNT_DUE = 'illegal_param_amount_due'
+ILLEGAL_PARAM_MESSAGE = 'illegal_param_message'
+PAYEE_NOT_FOUND = 'payee_not_found'
+PAYMENT_REFUSED = 'payment_refused'
+ILLEGAL_PARAMS = 'illegal_params'
+ILLEGAL_PARAM_REQUEST_ID = 'illegal_param_request_id'
+ILLEGAL_PARAM_INSTANCE_ID = 'illegal_param_instance_id'
+ILLEGAL_PARAM_MONEY_SOURCE_TOKEN = 'illegal_param_money_source_token'
+TECHNICAL_ERROR = 'technical_error'
 
 
 class APIException(Exception):
@@ -21,6 +53,16 @@ class TokenError(APIException):
     pass
 
 
+class CircuitOpenError(APIException):
+    """Raised without sending the request while a circuit breaker is open."""
+
+    def __init__(self, group, retry_after=0.0):
+        super(CircuitOpenError, self).__init__(
+            'circuit "{}" is open, retry in {:.1f}s'.format(group, retry_after))
+        self.group = group
+        self.retry_after = retry_after
+
+
 _errors = {
     'illegal_param_client_id': 'Недопустимое значение параметра client_id (не существует или заблокирован).'
                                'Дальнейшая работа приложения c данным client_id невозможна.',
@@ -67,12 +109,194 @@ _errors = {
     'illegal_param_instance_id': 'Отсутствует или указано недопустимое значение параметра instance_id.',
     'illegal_param_money_source_token': 'Отсутствует или указано недопустимое значение '
                                         'параметра money_source_token, токен отозван или истек его срок действия.',
+    'technical_error': 'Техническая ошибка, повторите вызов операции спустя некоторое время.',
+}
+
+_errors_en = {
+    'illegal_param_client_id': 'Invalid client_id (does not exist or is blocked). '
+                               'The application cannot work with this client_id any more.',
+    'contract_not_found': 'There is no unfinished payment with this request_id.',
+    'not_enough_funds': 'The payer does not have enough funds. '
+                        'The account must be topped up and a new payment made.',
+    'limit_exceeded': 'One of the operation limits was exceeded: the amount of the operation or '
+                      'the amount per period allowed for the access token, or Yandex.Money '
+                      'limits for this kind of operation.',
+    'money_source_not_available': 'The requested money_source is not available for this payment.',
+    'illegal_param_csc': 'The csc parameter is missing or invalid.',
+    'authorization_reject': 'Payment authorization was refused: the card has expired, the issuing '
+                            'bank declined the transaction, a limit for this user was exceeded, '
+                            'the transaction is forbidden for this user or the user has not '
+                            'accepted the Yandex.Money terms of use.',
+    'account_blocked': 'The user account is blocked. Send the user to account_unblock_uri '
+                       'to unblock it.',
+    'illegal_param_ext_auth_success_uri': 'The ext_auth_success_uri parameter is missing or invalid.',
+    'illegal_param_ext_auth_fail_uri': 'The ext_auth_fail_uri parameter is missing or invalid.',
+    'illegal_param_protection_code': 'The protection_code parameter is missing or invalid.',
+    'illegal_param_operation_id': 'The operation_id parameter is missing or invalid. There is no '
+                                  'transfer with this operation_id or it has been rejected.',
+    'ext_action_required': 'Transfers cannot be received at the moment. The user has to follow the '
+                           'instructions at ext_action_uri: enter identification data, accept '
+                           'the offer or take other actions.',
+    'already_rejected': 'The transfer has already been rejected.',
+    'illegal_param_to': 'Invalid value of the to parameter.',
+    'illegal_param_amount': 'Invalid value of the amount parameter.',
+    'illegal_param_amount_due': 'Invalid value of the amount_due parameter.',
+    'illegal_param_message': 'Invalid value of the message parameter.',
+    'payee_not_found': 'The payee was not found, the account does not exist.',
+    'payment_refused': 'The shop refused the payment (e.g. the user tried to pay for goods '
+                       'that are out of stock).',
+    'illegal_params': 'Required payment parameters are missing, invalid or contradictory.',
+    'illegal_param_request_id': 'Invalid request_id or there is no payment with this request_id.',
+    'illegal_param_instance_id': 'The instance_id parameter is missing or invalid.',
+    'illegal_param_money_source_token': 'The money_source_token parameter is missing or invalid, '
+                                        'the token has been revoked or has expired.',
+    'technical_error': 'Technical error, repeat the call later.',
+}
+
+_messages = {'ru': _errors, 'en': _errors_en}
+_default_messages = {
+    'ru': 'В авторизации платежа отказано. Приложению следует провести новый платеж спустя некоторое время.',
+    'en': 'Payment authorization was refused. The application should make a new payment later.',
 }
+_locale = 'ru'
+
+
+def set_locale(locale):
+    """Language of YandexPaymentError messages: 'ru' (default) or 'en'."""
+    global _locale
+    if locale not in _messages:
+        raise ValueError('unsupported locale: {}'.format(locale))
+    _locale = locale
 
 
 class YandexPaymentError(APIException):
+    """A refused call; ``error`` is the API error code.
+
+    Raised as the subclass registered for the code (see payment_error).
+    ``response`` is the decoded answer; the message is only rendered when
+    the exception is printed.
+    """
+    retryable = False
+
+    def __init__(self, error, response=None):
+        super(YandexPaymentError, self).__init__(error)
+        self.error = error
+        self.response = response
+
+    @property
+    def code(self):
+        return self.error
+
+    def _field(self, name):
+        return self.response.get(name) if self.response is not None else None
+
+    @property
+    def next_retry(self):
+        """Milliseconds to wait before repeating the call, if the API said so."""
+        next_retry = self._field('next_retry')
+        return int(next_retry) if next_retry is not None else None
+
+    @property
+    def account_unblock_uri(self):
+        return self._field('account_unblock_uri')
+
+    @property
+    def ext_action_uri(self):
+        return self._field('ext_action_uri')
+
+    def message(self, locale=None):
+        locale = locale or _locale
+        return _messages[locale].get(self.error, _default_messages[locale])
+
+    def __str__(self):
+        message = self.message()
+        return message.encode('utf-8') if str is bytes else message  # bytes on Python 2
+
+    def __unicode__(self):
+        return self.message()
+
+
+class InsufficientFundsError(YandexPaymentError):
+    pass
+
+
+class LimitExceededError(YandexPaymentError):
+    pass
+
+
+class AccountBlockedError(YandexPaymentError):
+    pass
+
+
+class ExtActionRequiredError(YandexPaymentError):
+    pass
+
+
+class AuthorizationRejectError(YandexPaymentError):
+    pass
+
+
+class MoneySourceNotAvailableError(YandexPaymentError):
+    pass
+
+
+class PayeeNotFoundError(YandexPaymentError):
+    pass
+
+
+class PaymentRefusedError(YandexPaymentError):
+    pass
+
+
+class ContractNotFoundError(YandexPaymentError):
+    pass
+
+
+class AlreadyRejectedError(YandexPaymentError):
+    pass
+
+
+class InvalidParameterError(YandexPaymentError):
+    """illegal_params or illegal_param_<name>; ``param`` is the name."""
+
+    @property
+    def param(self):
+        prefix = 'illegal_param_'
+        return self.error[len(prefix):] if (self.error or '').startswith(prefix) else None
+
+
+class TechnicalError(YandexPaymentError):
+    retryable = True
+
+
+_error_classes = {
+    NOT_ENOUGH_FUNDS: InsufficientFundsError,
+    LIMIT_EXCEEDED: LimitExceededError,
+    ACCOUNT_BLOCKED: AccountBlockedError,
+    EXT_ACTION_REQUIRED: ExtActionRequiredError,
+    AUTHORIZATION_REJECT: AuthorizationRejectError,
+    MONEY_SOURCE_NOT_AVAILABLE: MoneySourceNotAvailableError,
+    PAYEE_NOT_FOUND: PayeeNotFoundError,
+    PAYMENT_REFUSED: PaymentRefusedError,
+    CONTRACT_NOT_FOUND: ContractNotFoundError,
+    ALREADY_REJECTED: AlreadyRejectedError,
+    TECHNICAL_ERROR: TechnicalError,
+}
+
+
+def _error_class(error):
+    cls = _error_classes.get(error)
+    if cls is None:
+        cls = InvalidParameterError if (error or '').startswith('illegal_param') \
+            else YandexPaymentError
+    return cls
+
+
+def payment_error(error, response=None):
+    """The YandexPaymentError subclass instance for an API error code."""
+    return _error_class(error)(error, response)
+
 
-    def __init__(self, error, *args, **kwargs):
-        message = _errors.get(error, 'В авторизации платежа отказано.'
-                                     ' Приложению следует провести новый платеж спустя некоторое время.')
-        super(YandexPaymentError, self).__init__(message.encode('utf-8'), *args, **kwargs)
\ No newline at end of file
+def is_retryable(error):
+    """Whether a refusal with this code may succeed when repeated later."""
+    return _error_class(error).retryable
@@ -0,0 +1,238 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import threading
+import time
+
+from . import exceptions
+from .transport import url_path
+
+
+__all__ = ['Hook', 'MetricsCollector', 'add_hook', 'remove_hook',
+           'error_label']
+
+hooks = []  # read on every request, replaced (never mutated) by add/remove_hook
+_hooks_lock = threading.Lock()
+timer = getattr(time, 'perf_counter', time.time)  # timeit.default_timer without timeit
+
+
+class Hook(object):
+    """Base class for request observers; override the callbacks you need.
+
+    ``endpoint`` is the URL path, e.g. "/api/account-info" or "/oauth/token".
+    """
+
+    def before_request(self, endpoint, body):
+        pass
+
+    def after_request(self, endpoint, elapsed, status_code, error):
+        pass
+
+    def on_retry(self, endpoint, attempt, delay, reason):
+        pass
+
+    def on_queue_wait(self, key, waited):
+        pass
+
+
+def add_hook(hook):
+    global hooks
+    with _hooks_lock:
+        hooks = hooks + [hook]
+    return hook
+
+
+def remove_hook(hook):
+    global hooks
+    with _hooks_lock:
+        hooks = [registered for registered in hooks if registered is not hook]
+
+
+def error_label(error):
+    if error is None:
+        return 'ok'
+    if isinstance(error, exceptions.YandexPaymentError):
+        return 'YandexPaymentError:{}'.format(error.error)  # the code tells subclasses apart
+    return type(error).__name__
+
+
+class _Call(object):
+    __slots__ = ('hooks', 'endpoint', 'started')
+
+    def __init__(self, hooks, endpoint, body):
+        self.hooks = hooks
+        self.endpoint = endpoint
+        for hook in hooks:
+            hook.before_request(endpoint, body)
+        self.started = timer()
+
+    def finish(self, response, error=None):
+        elapsed = timer() - self.started
+        status_code = response.status_code if response is not None else None
+        for hook in self.hooks:
+            hook.after_request(self.endpoint, elapsed, status_code, error)
+
+
+def start(url, body):
+    """Notify hooks about a request; returns None when nobody listens."""
+    if not hooks:
+        return None
+    return _Call(hooks, url_path(url), body)
+
+
+def retry(url, attempt, delay, reason):
+    for hook in hooks:
+        hook.on_retry(url_path(url), attempt, delay, reason)
+
+
+def queue_wait(key, waited):
+    for hook in hooks:
+        hook.on_queue_wait(key, waited)
+
+
+class MetricsCollector(Hook):
+    """Aggregates per-endpoint latency histograms, outcome and retry counters.
+
+    Install with ``add_hook(MetricsCollector())``. ``render_prometheus()``
+    returns the text exposition format; the collector can also be registered
+    with a ``prometheus_client`` registry directly.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=None, namespace='yandex_money'):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.namespace = namespace
+        self.transports = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.latency = {}  # endpoint -> [bucket counts..., +Inf], sum
+            self.requests = {}  # (endpoint, outcome) -> count
+            self.retries = {}  # (endpoint, reason) -> count
+            self.queue_waits = {}  # rate limiter key -> [count, seconds]
+
+    def watch_transport(self, transport):
+        """Report connection reuse of a transport having connection_stats()."""
+        self.transports.append(transport)
+        return transport
+
+    def before_request(self, endpoint, body):
+        with self._lock:
+            self.in_flight += 1
+
+    def after_request(self, endpoint, elapsed, status_code, error):
+        outcome = error_label(error)
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = histogram[0]
+            for index, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            histogram[1] += elapsed
+            key = (endpoint, outcome)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def on_retry(self, endpoint, attempt, delay, reason):
+        key = (endpoint, reason)
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def on_queue_wait(self, key, waited):
+        with self._lock:
+            entry = self.queue_waits.get(key)
+            if entry is None:
+                entry = self.queue_waits[key] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += waited
+
+    def connection_stats(self):
+        totals = {}
+        for transport in self.transports:
+            for name, value in transport.connection_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def snapshot(self):
+        with self._lock:
+            latency = {}
+            for endpoint, (counts, total) in self.latency.items():
+                cumulative, running = [], 0
+                for count in counts:
+                    running += count
+                    cumulative.append(running)
+                latency[endpoint] = {'buckets': list(zip(self.buckets + (float('inf'),),
+                                                         cumulative)),
+                                     'count': running, 'sum': total}
+            return {'in_flight': self.in_flight,
+                    'latency': latency,
+                    'requests': dict(self.requests),
+                    'retries': dict(self.retries),
+                    'queue_waits': dict((key, tuple(entry))
+                                        for key, entry in self.queue_waits.items()),
+                    'connections': self.connection_stats()}
+
+    def _families(self):
+        # (name, type, help, [(suffix, labels, value)])
+        snapshot = self.snapshot()
+        prefix = self.namespace + '_'
+        latency = []
+        for endpoint, histogram in sorted(snapshot['latency'].items()):
+            for bound, count in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                latency.append(('_bucket', {'endpoint': endpoint, 'le': le}, count))
+            latency.append(('_count', {'endpoint': endpoint}, histogram['count']))
+            latency.append(('_sum', {'endpoint': endpoint}, histogram['sum']))
+        return [
+            (prefix + 'request_duration_seconds', 'histogram',
+             'API request latency', latency),
+            (prefix + 'requests', 'counter', 'API requests by outcome',
+             [('_total', {'endpoint': endpoint, 'outcome': outcome}, count)
+              for (endpoint, outcome), count in sorted(snapshot['requests'].items())]),
+            (prefix + 'retries', 'counter', 'Retried API requests',
+             [('_total', {'endpoint': endpoint, 'reason': reason}, count)
+              for (endpoint, reason), count in sorted(snapshot['retries'].items())]),
+            (prefix + 'rate_limit_wait_seconds', 'summary',
+             'Time spent waiting for the client-side rate limiter',
+             [sample for key, (count, total) in sorted(snapshot['queue_waits'].items())
+              for sample in (('_count', {'key': key}, count),
+                             ('_sum', {'key': key}, total))]),
+            (prefix + 'requests_in_flight', 'gauge', 'API requests in flight',
+             [('', {}, snapshot['in_flight'])]),
+            (prefix + 'connections', 'gauge', 'Pooled connection statistics',
+             [('', {'kind': kind}, value)
+              for kind, value in sorted(snapshot['connections'].items())]),
+        ]
+
+    def render_prometheus(self):
+        lines = []
+        for name, kind, description, samples in self._families():
+            # counter families are named without the _total of their samples
+            exposed = name + '_total' if kind == 'counter' else name
+            lines.append('# HELP {} {}'.format(exposed, description))
+            lines.append('# TYPE {} {}'.format(exposed, kind))
+            for suffix, labels, value in samples:
+                label_text = ','.join('{}="{}"'.format(key, labels[key])
+                                      for key in sorted(labels))
+                lines.append('{}{}{} {}'.format(name, suffix,
+                                                '{' + label_text + '}' if labels else '',
+                                                value))
+        return '\n'.join(lines) + '\n'
+
+    def collect(self):
+        """prometheus_client custom collector protocol."""
+        from prometheus_client.core import Metric
+
+        for name, kind, description, samples in self._families():
+            metric = Metric(name, description, kind)
+            for suffix, labels, value in samples:
+                metric.add_sample(name + suffix, labels, value)
+            yield metric
@@ -0,0 +1,70 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+__all__ = ['loads', 'decode_response', 'set_json_backend', 'get_json_backend']
+
+
+def _stdlib_loads(data):
+    import json
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def _load_backend(name):
+    if name == 'json':
+        return _stdlib_loads
+    if name == 'orjson':
+        import orjson
+        return orjson.loads
+    if name == 'ujson':
+        import ujson
+        return ujson.loads
+    raise ValueError('unknown json backend: {}'.format(name))
+
+
+def _pick_backend():
+    for name in ('orjson', 'ujson'):
+        try:
+            return name, _load_backend(name)
+        except ImportError:
+            pass
+    return 'json', _stdlib_loads
+
+
+_backend_name = _loads = None  # picked by the first decode, not at import time
+
+
+def _backend():
+    global _backend_name, _loads
+    if _loads is None:
+        _backend_name, _loads = _pick_backend()
+    return _loads
+
+
+def loads(data):
+    return (_loads or _backend())(data)
+
+
+def get_json_backend():
+    _backend()
+    return _backend_name
+
+
+def set_json_backend(backend):
+    """Use 'orjson', 'ujson', 'json' (stdlib) or any callable taking bytes."""
+    global _backend_name, _loads
+    if callable(backend):
+        _backend_name, _loads = getattr(backend, '__name__', repr(backend)), backend
+    else:
+        _backend_name, _loads = backend, _load_backend(backend)
+
+
+def decode_response(response):
+    """Parse a response body once; later calls return the same object."""
+    try:
+        return response._yandex_money_json
+    except AttributeError:
+        body = response._yandex_money_json = (_loads or _backend())(response.content)
+        return body
@@ -0,0 +1,114 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from .transport import url_path
+
+
+__all__ = ['Response', 'AccountInfo', 'BalanceDetails', 'LinkedCard',
+           'OperationHistory', 'Operation', 'RequestPayment', 'ProcessPayment',
+           'ExternalPaymentResponse', 'InstanceId', 'model_for_url']
+
+
+class MissingField(AttributeError, KeyError):
+    pass
+
+
+class Response(dict):
+    """API response: a plain dict whose keys are also readable as attributes.
+
+    Attribute lookup only falls back to the dict for names that are not
+    regular attributes, so dict methods and field access are both O(1).
+    Nested objects and lists of objects are wrapped into response models on
+    first attribute access (see ``NESTED``); item access returns them as is.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    NESTED = {}
+
+    def __getattr__(self, name):
+        try:
+            value = self[name]
+        except KeyError:
+            raise MissingField(name)
+        if isinstance(value, dict):
+            if not isinstance(value, Response):
+                value = self.NESTED.get(name, Response)(value)
+                self[name] = value
+        elif isinstance(value, list) and value and isinstance(value[0], dict) \
+                and not isinstance(value[0], Response):
+            model = self.NESTED.get(name, Response)
+            value = [model(item) for item in value]
+            self[name] = value
+        return value
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) | set(self.FIELDS) | set(self))
+
+
+class BalanceDetails(Response):
+    __slots__ = ()
+    FIELDS = ('total', 'available', 'deposition_pending', 'blocked', 'debt', 'hold')
+
+
+class LinkedCard(Response):
+    __slots__ = ()
+    FIELDS = ('pan_fragment', 'type')
+
+
+class AccountInfo(Response):
+    __slots__ = ()
+    FIELDS = ('account', 'balance', 'currency', 'account_status', 'account_type',
+              'avatar', 'balance_details', 'cards_linked', 'services_additional')
+    NESTED = {'balance_details': BalanceDetails, 'cards_linked': LinkedCard}
+
+
+class Operation(Response):
+    __slots__ = ()
+    FIELDS = ('operation_id', 'status', 'datetime', 'title', 'pattern_id',
+              'direction', 'amount', 'label', 'type')
+
+
+class OperationHistory(Response):
+    __slots__ = ()
+    FIELDS = ('error', 'next_record', 'operations')
+    NESTED = {'operations': Operation}
+
+
+class RequestPayment(Response):
+    __slots__ = ()
+    FIELDS = ('status', 'error', 'money_source', 'request_id', 'contract_amount',
+              'balance', 'recipient_account_status', 'recipient_account_type',
+              'protection_code', 'account_unblock_uri', 'ext_action_uri')
+
+
+class ProcessPayment(Response):
+    __slots__ = ()
+    FIELDS = ('status', 'error', 'payment_id', 'balance', 'invoice_id', 'payer',
+              'payee', 'credit_amount', 'account_unblock_uri', 'hold_for_pickup_link',
+              'acs_uri', 'acs_params', 'next_retry', 'digital_goods')
+
+
+class ExternalPaymentResponse(Response):
+    __slots__ = ()
+    FIELDS = ('status', 'error', 'request_id', 'contract_amount', 'title',
+              'invoice_id', 'acs_uri', 'acs_params', 'money_source', 'next_retry')
+
+
+class InstanceId(Response):
+    __slots__ = ()
+    FIELDS = ('status', 'error', 'instance_id')
+
+
+_MODELS = {
+    '/api/account-info': AccountInfo,
+    '/api/operation-history': OperationHistory,
+    '/api/request-payment': RequestPayment,
+    '/api/process-payment': ProcessPayment,
+    '/api/request-external-payment': ExternalPaymentResponse,
+    '/api/process-external-payment': ExternalPaymentResponse,
+    '/api/instance-id': InstanceId,
+}
+
+
+def model_for_url(url):
+    return _MODELS.get(url_path(url), Response)
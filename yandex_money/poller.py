@@ -0,0 +1,203 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import heapq
+import itertools
+import threading
+import time
+
+from six.moves import queue
+
+from . import exceptions
+
+
+__all__ = ['StatusPoller', 'PollResult']
+
+
+class PollResult(object):
+    def __init__(self, request_id, response=None, error=None, expired=False):
+        self.request_id = request_id
+        self.response = response
+        self.error = error
+        self.expired = expired
+
+    @property
+    def status(self):
+        if self.response is not None:
+            return self.response['status']
+        if isinstance(self.error, exceptions.YandexPaymentError):
+            return 'refused'
+        return None
+
+    def __repr__(self):
+        return '<PollResult {} status={} expired={} error={!r}>'.format(
+            self.request_id, self.status, self.expired, self.error)
+
+
+class _Pending(object):
+    __slots__ = ('request_id', 'options', 'callback', 'deadline', 'polls')
+
+    def __init__(self, request_id, options, callback, deadline):
+        self.request_id = request_id
+        self.options = options
+        self.callback = callback
+        self.deadline = deadline
+        self.polls = 0
+
+
+class StatusPoller(object):
+    """Babysits many pending external payments on a shared worker pool.
+
+    Added payments are re-processed in order of their due time: after the
+    response's ``next_retry`` for ``in_progress``, or ``pending_interval``
+    seconds while the payer is on the 3-D Secure page (``ext_auth_required``);
+    refusals with a retryable error code are repeated after ``next_retry``.
+    A request_id is polled by at most one worker at a time and added once.
+    Final results go to the per-payment callback, to ``on_complete`` and to
+    the ``completed()`` iterator.
+    """
+    PENDING_STATUSES = frozenset(['in_progress', 'ext_auth_required'])
+
+    def __init__(self, external_payment, max_workers=8, pending_interval=5.0,
+                 default_retry=1000, timeout=None, on_complete=None,
+                 clock=time.time):
+        self.payment = external_payment
+        self.max_workers = max_workers
+        self.pending_interval = pending_interval
+        self.default_retry = default_retry
+        self.timeout = timeout
+        self.on_complete = on_complete
+        self.clock = clock
+        self._pending = {}  # request_id -> _Pending
+        self._due = []  # heap of (due, seq, request_id)
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        self._stopped = False
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def add(self, request_id, options=None, callback=None, delay=0):
+        """Track a payment; ``options`` are extra process() parameters."""
+        with self._condition:
+            if request_id in self._pending:
+                return False
+            deadline = self.clock() + self.timeout if self.timeout is not None else None
+            self._pending[request_id] = _Pending(request_id, dict(options or {}),
+                                                 callback, deadline)
+            self._schedule(request_id, delay)
+        return True
+
+    def _schedule(self, request_id, delay):
+        heapq.heappush(self._due, (self.clock() + delay, next(self._seq), request_id))
+        self._condition.notify()
+
+    def start(self):
+        if self._threads:
+            return self
+        self._threads.append(threading.Thread(target=self._dispatch))
+        self._threads.extend(threading.Thread(target=self._work)
+                             for _ in range(self.max_workers))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for _ in range(self.max_workers):
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _dispatch(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._due:
+                    self._condition.wait()
+                    continue
+                due, _, request_id = self._due[0]
+                wait = due - self.clock()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                heapq.heappop(self._due)
+                self._tasks.put(request_id)
+
+    def _work(self):
+        while True:
+            request_id = self._tasks.get()
+            if request_id is None:
+                return
+            self.poll(request_id)
+
+    def poll(self, request_id):
+        """Process one tracked payment now and reschedule or complete it."""
+        entry = self._pending.get(request_id)
+        if entry is None:
+            return
+        entry.polls += 1
+        options = dict(entry.options, request_id=request_id)
+        try:
+            response, error = self.payment.process(options), None
+        except exceptions.YandexPaymentError as refusal:
+            if not refusal.retryable:
+                return self._complete(entry, PollResult(request_id, error=refusal))
+            response, error = None, refusal
+            delay = int(refusal.next_retry or self.default_retry) / 1000.0
+        except Exception as failure:
+            return self._complete(entry, PollResult(request_id, error=failure))
+        else:
+            status = response['status']
+            if status not in self.PENDING_STATUSES:
+                return self._complete(entry, PollResult(request_id, response))
+            if status == 'in_progress':
+                delay = int(response.get('next_retry') or self.default_retry) / 1000.0
+            else:
+                delay = self.pending_interval
+        if entry.deadline is not None and self.clock() + delay > entry.deadline:
+            return self._complete(entry, PollResult(request_id, response, error, expired=True))
+        with self._condition:
+            self._schedule(request_id, delay)
+
+    def _complete(self, entry, result):
+        try:
+            for callback in (entry.callback, self.on_complete):
+                if callback is not None:
+                    callback(result)
+        finally:
+            # queue the result before untracking: completed() reads len() first
+            self._results.put(result)
+            with self._condition:
+                self._pending.pop(entry.request_id, None)
+        return result
+
+    def completed(self, timeout=None):
+        """Yield results as payments finish, until nothing is pending."""
+        while True:
+            # checked before draining: a result is queued before it is untracked
+            pending = len(self)
+            try:
+                yield self._results.get(block=False)
+                continue
+            except queue.Empty:
+                pass
+            if not pending:
+                return
+            try:
+                yield self._results.get(timeout=timeout)
+            except queue.Empty:
+                return
@@ -0,0 +1,185 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from collections import deque
+from contextlib import contextmanager
+import hashlib
+import threading
+import time
+
+from . import instrumentation
+
+
+__all__ = ['RateLimiter', 'TokenBucket', 'InFlightLimit']
+
+
+class TokenBucket(object):
+    """Token bucket handing out reservations.
+
+    ``reserve()`` takes a token immediately and returns how long the caller
+    has to wait before using it, so blocking threads and asyncio tasks can
+    share one bucket.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class InFlightLimit(object):
+    """Counting semaphore usable from threads and event loops alike.
+
+    Waiters are served in FIFO order; a released slot is handed over
+    directly to the next waiter.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, waiter):
+        """Take a slot, or queue ``waiter`` (an Event or a (loop, future) pair)."""
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def cancel_wait(self, waiter):
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass  # slot already handed over; released by _wake or the waiter
+
+    def acquire(self):
+        event = threading.Event()
+        if not self.try_acquire(event):
+            event.wait()
+
+    def _wake(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, tuple):
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._wake, future)
+        else:
+            waiter.set()
+
+
+class _Limit(object):
+    def __init__(self, rate, burst, max_in_flight, clock):
+        self.bucket = TokenBucket(rate, burst, clock) if rate else None
+        self.in_flight = InFlightLimit(max_in_flight) if max_in_flight else None
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, waited):
+        if waited > 0:
+            self.waits += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+
+class RateLimiter(object):
+    """Client-side pacing per access token (Wallet) or client (ExternalPayment).
+
+    Every key gets its own token bucket of ``rate`` requests per second
+    (``burst`` at once) and at most ``max_in_flight`` concurrent requests;
+    ``set_limit`` overrides them for a single key. One limiter may be shared
+    by many wallets, threads and asyncio tasks (see aio.acquire_rate_limit).
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None,
+                 clock=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self.sleep = sleep
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for_token(token):
+        return 'token:' + hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def key_for_client(client_id=None, instance_id=None):
+        if client_id is not None:
+            return 'client:{}'.format(client_id)
+        return 'instance:{}'.format(instance_id)
+
+    def set_limit(self, key, rate=None, burst=None, max_in_flight=None):
+        with self._lock:
+            self._limits[key] = _Limit(rate, burst, max_in_flight, self.clock)
+
+    def limit(self, key):
+        limit = self._limits.get(key)
+        if limit is None:
+            with self._lock:
+                limit = self._limits.get(key)
+                if limit is None:
+                    limit = self._limits[key] = _Limit(self.rate, self.burst,
+                                                       self.max_in_flight, self.clock)
+        return limit
+
+    @contextmanager
+    def acquire(self, key):
+        limit = self.limit(key)
+        started = self.clock()
+        if limit.in_flight is not None:
+            limit.in_flight.acquire()
+        try:
+            if limit.bucket is not None:
+                delay = limit.bucket.reserve()
+                if delay:
+                    self.sleep(delay)
+            self.waited(key, limit, self.clock() - started)
+            yield
+        finally:
+            if limit.in_flight is not None:
+                limit.in_flight.release()
+
+    def release(self, key):
+        limit = self.limit(key)
+        if limit.in_flight is not None:
+            limit.in_flight.release()
+
+    def waited(self, key, limit, waited):
+        limit.record_wait(waited)
+        if waited > 0:
+            instrumentation.queue_wait(key, waited)
+
+    def stats(self):
+        return dict((key, {'waits': limit.waits,
+                           'wait_time': limit.wait_time,
+                           'max_wait': limit.max_wait,
+                           'in_flight': limit.in_flight.in_flight
+                           if limit.in_flight is not None else None})
+                    for key, limit in list(self._limits.items()))
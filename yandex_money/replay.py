@@ -0,0 +1,249 @@
+"""Record API traffic to a file and replay it without network access.
+
+RecordingTransport wraps a real transport and appends every exchange to a
+JSON-lines file (gzip-compressed when the name ends with ".gz").
+ReplayTransport answers from such a recording, and Replayer re-issues the
+recorded requests through the SDK's request path at a chosen speed and
+concurrency, e.g. for throughput tests or profiling.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from collections import deque
+import json
+import threading
+import time
+
+from six.moves.urllib.parse import parse_qsl
+
+from . import instrumentation
+from .api import Wallet, ExternalPayment
+from .breaker import EXTERNAL_PATHS
+from .templates import encode_form
+from .transport import Transport, get_default_transport, url_path
+
+
+__all__ = ['RecordingTransport', 'ReplayTransport', 'ReplayResponse', 'Replayer',
+           'read_recording']
+
+FORMAT_VERSION = 1
+# request fields and response keys that are never written to a recording
+REDACTED = frozenset(['client_secret', 'code', 'csc', 'money_source_token',
+                      'protection_code', 'access_token', 'aux_token'])
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _redact_body(data):
+    if not data:
+        return ''
+    if not isinstance(data, dict):
+        data = dict(parse_qsl(data))
+    return encode_form(dict((key, '***' if key in REDACTED else value)
+                            for key, value in data.items()))
+
+
+def _redact_content(content):
+    try:
+        body = json.loads(content.decode('utf-8'))
+    except ValueError:
+        return content
+    if isinstance(body, dict) and REDACTED.intersection(body):
+        for key in REDACTED.intersection(body):
+            body[key] = '***'
+        return json.dumps(body).encode('utf-8')
+    return content
+
+
+def read_recording(path):
+    """Return the recorded exchanges of ``path`` as a list of dicts."""
+    entries = []
+    with _open(path, 'rb') as f:
+        for line in f:
+            entry = json.loads(line.decode('utf-8'))
+            if 'version' not in entry:
+                entries.append(entry)
+    return entries
+
+
+class RecordingTransport(Transport):
+    """Passes calls to ``transport`` and appends each exchange to ``path``.
+
+    Every line holds the offset from the first call, the URL, the form body,
+    the status, the response body and the time taken. Secrets listed in
+    REDACTED are replaced by "***"; headers are not recorded.
+    """
+
+    def __init__(self, path, transport=None, clock=time.time):
+        self.path = path
+        self.transport = transport or get_default_transport()
+        self.clock = clock
+        self.recorded = 0
+        self._started = None
+        self._file = _open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def post(self, url, headers=None, data=None):
+        started = self.clock()
+        if self._started is None:
+            with self._lock:
+                if self._started is None:
+                    self._started = started
+                    header = {'version': FORMAT_VERSION, 'started': started}
+                    self._file.write((json.dumps(header) + '\n').encode('utf-8'))
+        entry = {'t': round(started - self._started, 6), 'url': url,
+                 'body': _redact_body(data)}
+        try:
+            response = self.transport.post(url, headers=headers, data=data)
+        except Exception as error:
+            entry.update(error=type(error).__name__,
+                         elapsed=round(self.clock() - started, 6))
+            self._write(entry)
+            raise
+        entry.update(status=response.status_code,
+                     content=_redact_content(response.content).decode('utf-8', 'replace'),
+                     elapsed=round(self.clock() - started, 6))
+        self._write(entry)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self.transport.close()
+
+
+class ReplayResponse(object):
+    """The part of the requests.Response interface used by the SDK."""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def raise_for_status(self):
+        if not self.ok:
+            from requests.exceptions import HTTPError
+
+            raise HTTPError('{} Error for url: {}'.format(self.status_code, self.url),
+                            response=self)
+
+
+def _replay_error(name):
+    import requests.exceptions
+
+    error = getattr(requests.exceptions, name, None)
+    if isinstance(error, type) and issubclass(error, Exception):
+        return error('replayed {}'.format(name))
+    return IOError('replayed {}'.format(name))
+
+
+class ReplayTransport(Transport):
+    """Answers requests from a recording instead of the network.
+
+    Each endpoint (URL path) returns its recorded responses in order and
+    starts over when they run out. With ``speed`` set, every answer takes
+    its recorded time divided by ``speed``; with None it returns at once.
+    """
+
+    def __init__(self, recording, speed=None, sleep=time.sleep):
+        entries = read_recording(recording) if not isinstance(recording, list) else recording
+        self.speed = speed
+        self.sleep = sleep
+        self._answers = {}  # path -> deque of entries
+        for entry in entries:
+            self._answers.setdefault(url_path(entry['url']), deque()).append(entry)
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, data=None):
+        path = url_path(url)
+        with self._lock:
+            answers = self._answers.get(path)
+            if not answers:
+                raise LookupError('nothing recorded for {}'.format(path))
+            entry = answers.popleft()
+            answers.append(entry)
+        if self.speed:
+            self.sleep(entry.get('elapsed', 0) / self.speed)
+        if 'error' in entry:
+            raise _replay_error(entry['error'])
+        return ReplayResponse(url, entry['status'], entry['content'].encode('utf-8'))
+
+
+class Replayer(object):
+    """Re-issues recorded requests through BasePayment's request path.
+
+    Requests start at their recorded offsets divided by ``speed`` (as fast
+    as possible with None) on ``concurrency`` threads, so responses are
+    parsed, typed and mapped to exceptions exactly as in production.
+    ``run()`` returns call counts, outcomes and latencies.
+    """
+
+    def __init__(self, recording, speed=None, concurrency=1, transport=None,
+                 clock=time.time, sleep=time.sleep):
+        self.entries = read_recording(recording) if not isinstance(recording, list) else recording
+        self.speed = speed
+        self.concurrency = concurrency
+        self.transport = transport or ReplayTransport(self.entries, speed, sleep)
+        self.clock = clock
+        self.sleep = sleep
+
+    def call(self, entry):
+        cls = ExternalPayment if url_path(entry['url']) in EXTERNAL_PATHS else Wallet
+        return cls._request(entry['url'], {}, entry['body'], self.transport)
+
+    def run(self, loops=1):
+        schedule = deque((loop, entry) for loop in range(loops) for entry in self.entries)
+        duration = self.entries[-1]['t'] if self.entries else 0
+        outcomes, latencies = {}, []
+        lock = threading.Lock()
+        started = self.clock()
+
+        def worker():
+            while True:
+                with lock:
+                    if not schedule:
+                        return
+                    loop, entry = schedule.popleft()
+                if self.speed:
+                    delay = started + (loop * duration + entry['t']) / self.speed - self.clock()
+                    if delay > 0:
+                        self.sleep(delay)
+                call_started = self.clock()
+                error = None
+                try:
+                    self.call(entry)
+                except Exception as e:  # counted in outcomes, the run goes on
+                    error = e
+                outcome = instrumentation.error_label(error)
+                with lock:
+                    latencies.append(self.clock() - call_started)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = self.clock() - started
+        return {'calls': len(latencies), 'elapsed': elapsed,
+                'throughput': len(latencies) / elapsed if elapsed else 0.0,
+                'outcomes': outcomes, 'latencies': sorted(latencies)}
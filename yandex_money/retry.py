@@ -0,0 +1,126 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import random
+import time
+
+import requests
+import six
+from six.moves.urllib.parse import parse_qsl, urlparse
+
+from . import exceptions, instrumentation
+from .jsonutil import decode_response
+from .transport import Transport, get_default_transport
+
+
+__all__ = ['RetryPolicy', 'RetryTransport']
+
+
+class RetryPolicy(object):
+    """Decides whether and when a request is repeated.
+
+    Transient failures (connection errors, ``retry_statuses``) are retried
+    with exponential backoff and full jitter, but only for requests that are
+    safe to repeat: read-only endpoints, or calls keyed on a ``request_id``.
+    ``in_progress`` answers of the process endpoints, and refusals with a
+    retryable error code (exceptions.is_retryable), are repeated after
+    their ``next_retry``. Nothing is retried past ``max_elapsed`` seconds.
+    """
+    RETRY_STATUSES = frozenset([500, 502, 503, 504])
+    IDEMPOTENT_PATHS = frozenset([
+        '/api/account-info',
+        '/api/operation-history',
+        '/api/operation-details',
+        '/api/instance-id',
+    ])
+    POLL_PATHS = frozenset([
+        '/api/process-payment',
+        '/api/process-external-payment',
+    ])
+
+    def __init__(self, max_attempts=5, backoff=0.5, max_backoff=30.0,
+                 jitter=True, max_elapsed=60.0, poll_in_progress=True,
+                 default_retry=1000, retry_statuses=None):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.poll_in_progress = poll_in_progress
+        self.default_retry = default_retry
+        if retry_statuses is not None:
+            self.RETRY_STATUSES = frozenset(retry_statuses)
+
+    def is_idempotent(self, url, data=None):
+        if urlparse(url).path in self.IDEMPOTENT_PATHS:
+            return True
+        if isinstance(data, six.string_types):  # form-encoded by a RequestTemplate
+            data = dict(parse_qsl(data))
+        return bool(data and data.get('request_id'))
+
+    def backoff_delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def delay_for_error(self, attempt, url, data=None, connect_failed=False):
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if not (connect_failed or self.is_idempotent(url, data)):
+            return None
+        return self.backoff_delay(attempt)
+
+    def delay_for_response(self, attempt, url, data, response):
+        if response.status_code in self.RETRY_STATUSES:
+            return self.delay_for_error(attempt, url, data)
+        if (self.poll_in_progress and response.status_code == 200
+                and urlparse(url).path in self.POLL_PATHS):
+            body = decode_response(response)
+            if body.get('status') == 'in_progress':
+                return int(body.get('next_retry') or self.default_retry) / 1000.0
+            if body.get('status') == 'refused' and exceptions.is_retryable(body.get('error')) \
+                    and attempt + 1 < self.max_attempts:
+                return int(body.get('next_retry') or self.default_retry) / 1000.0
+        return None
+
+    def retry_reason(self, response):
+        if response.status_code in self.RETRY_STATUSES:
+            return 'http_{}'.format(response.status_code)
+        body = decode_response(response)
+        if body.get('status') == 'refused':
+            return 'refused:{}'.format(body.get('error'))
+        return 'in_progress'
+
+
+class RetryTransport(Transport):
+    """Wraps another transport and repeats calls according to a RetryPolicy."""
+
+    def __init__(self, transport=None, policy=None, sleep=time.sleep,
+                 clock=time.time):
+        self.transport = transport or get_default_transport()
+        self.policy = policy or RetryPolicy()
+        self.sleep = sleep
+        self.clock = clock
+
+    def post(self, url, headers=None, data=None):
+        started = self.clock()
+        attempt = 0
+        while True:
+            try:
+                response = self.transport.post(url, headers=headers, data=data)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                connect_failed = isinstance(error, requests.ConnectTimeout)
+                delay = self.policy.delay_for_error(attempt, url, data, connect_failed)
+                if delay is None or self.clock() - started + delay > self.policy.max_elapsed:
+                    raise
+                reason = type(error).__name__
+            else:
+                delay = self.policy.delay_for_response(attempt, url, data, response)
+                if delay is None or self.clock() - started + delay > self.policy.max_elapsed:
+                    return response
+                reason = self.policy.retry_reason(response)
+            instrumentation.retry(url, attempt, delay, reason)
+            self.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
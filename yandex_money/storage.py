@@ -0,0 +1,277 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from contextlib import contextmanager
+import os
+import struct
+import threading
+
+
+__all__ = ['MemoryStore', 'FileStore', 'SqliteStore', 'MmapStore',
+           'get_default_store', 'set_default_store']
+
+_replace = getattr(os, 'replace', os.rename)  # os.replace is Python 3.3+
+
+
+class MemoryStore(object):
+    """Process-local key/value store; the default for SDK caches."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def keys(self):
+        return list(self._data)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileStore(object):
+    """JSON file store surviving restarts.
+
+    Writes go to a temporary file that is renamed over ``path``, so readers
+    in other processes always see a complete document.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import json  # like sqlite3 and tempfile, only needed by persistent stores
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _dump(self, data):
+        import json
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.yandex_money')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        _replace(tmp_path, self.path)
+
+    def get(self, key):
+        return self._load().get(key)
+
+    def keys(self):
+        return list(self._load())
+
+    def set(self, key, value):
+        with self._lock:
+            data = self._load()
+            data[key] = value
+            self._dump(data)
+
+    def delete(self, key):
+        with self._lock:
+            data = self._load()
+            if data.pop(key, None) is not None:
+                self._dump(data)
+
+    def clear(self):
+        with self._lock:
+            self._dump({})
+
+
+class SqliteStore(object):
+    """sqlite-backed store that can be shared by many processes."""
+
+    def __init__(self, path, table='yandex_money_store', timeout=30.0):
+        self.path = path
+        self.table = table
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS {} '
+                               '(key TEXT PRIMARY KEY, value TEXT)'.format(table))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            import sqlite3
+
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        import json
+
+        row = self._connection().execute(
+            'SELECT value FROM {} WHERE key = ?'.format(self.table), (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def keys(self):
+        return [row[0] for row in self._connection().execute(
+            'SELECT key FROM {}'.format(self.table))]
+
+    def set(self, key, value):
+        import json
+
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO {} (key, value) VALUES (?, ?)'
+                               .format(self.table), (key, json.dumps(value)))
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM {} WHERE key = ?'.format(self.table), (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM {}'.format(self.table))
+
+
+class MmapStore(object):
+    """Store in a memory-mapped file shared by the processes of one host.
+
+    The values live in a single JSON document after a header holding a
+    version counter. A reader decodes the document again only after another
+    process changed it, so lookups of warm values cost no system calls.
+    Writers hold an exclusive flock. Put ``path`` on a tmpfs such as
+    /dev/shm to keep it in shared memory only. The file grows as needed.
+    POSIX only.
+    """
+    _HEADER = struct.Struct(str('<QQ'))  # version, document length
+
+    def __init__(self, path, size=65536):
+        self.path = path
+        self.size = max(size, self._HEADER.size)
+        self._lock = threading.Lock()
+        self._version = None  # version of self._data
+        self._data = {}
+        self._open()
+
+    def _open(self):
+        import mmap
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._file_lock(exclusive=True):
+            if os.fstat(self._fd).st_size < self.size:
+                os.ftruncate(self._fd, self.size)
+        self._map = mmap.mmap(self._fd, 0)
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # a forked child shares the parent's flock; it needs a descriptor of its own
+        if self._pid != os.getpid():
+            self._map.close()
+            os.close(self._fd)
+            self._version = None
+            self._open()
+
+    @contextmanager
+    def _file_lock(self, exclusive=False):
+        import fcntl
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _remap(self):
+        import mmap
+
+        self._map.close()
+        self._map = mmap.mmap(self._fd, 0)
+
+    def _read(self):
+        # under the file lock
+        import json
+
+        version, length = self._HEADER.unpack_from(self._map, 0)
+        if version != self._version:
+            end = self._HEADER.size + length
+            if end > len(self._map):  # grown by another process
+                self._remap()
+            self._data = json.loads(self._map[self._HEADER.size:end].decode('utf-8')) \
+                if length else {}
+            self._version = version
+        return self._data
+
+    def _write(self, data):
+        # under the exclusive file lock, right after _read()
+        import json
+
+        document = json.dumps(data).encode('utf-8')
+        end = self._HEADER.size + len(document)
+        if end > len(self._map):
+            os.ftruncate(self._fd, max(end, 2 * len(self._map)))
+            self._remap()
+        self._map[self._HEADER.size:end] = document
+        self._version += 1
+        self._HEADER.pack_into(self._map, 0, self._version, len(document))
+        self._data = data
+
+    def _current(self):
+        self._check_fork()
+        if self._HEADER.unpack_from(self._map, 0)[0] != self._version:
+            with self._file_lock():
+                self._read()
+        return self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._current().get(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._current())
+
+    def _update(self, change):
+        with self._lock:
+            self._check_fork()
+            with self._file_lock(exclusive=True):
+                data = dict(self._read())
+                if change(data) is not False:
+                    self._write(data)
+
+    def set(self, key, value):
+        self._update(lambda data: data.__setitem__(key, value))
+
+    def delete(self, key):
+        self._update(lambda data: data.pop(key, None) is not None)
+
+    def clear(self):
+        self._update(dict.clear)
+
+    def close(self):
+        with self._lock:
+            self._map.close()
+            os.close(self._fd)
+
+
+_default_store = None
+
+
+def get_default_store():
+    """Store used by SDK caches that were not given one explicitly."""
+    global _default_store
+    if _default_store is None:
+        _default_store = MemoryStore()
+    return _default_store
+
+
+def set_default_store(store):
+    """Share SDK state, e.g. ``set_default_store(MmapStore('/dev/shm/ym'))``."""
+    global _default_store
+    _default_store = store
@@ -0,0 +1,174 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+from datetime import datetime, timedelta
+import json
+import re
+import sqlite3
+import threading
+
+from .jsonutil import loads
+from .models import Operation
+
+
+__all__ = ['OperationStore', 'HistorySync']
+
+_DATETIME = re.compile(r'^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:?\d\d)?$')
+
+
+def to_utc(value):
+    """Normalize an RFC 3339 datetime so that string order is time order."""
+    match = _DATETIME.match(value)
+    if match is None:
+        raise ValueError('unsupported datetime: {}'.format(value))
+    moment = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S')
+    if match.group(2):
+        moment += timedelta(microseconds=int(float(match.group(2)) * 1000000))
+    zone = match.group(3)
+    if zone and zone != 'Z':
+        sign = 1 if zone[0] == '+' else -1
+        zone = zone[1:].replace(':', '')
+        moment -= sign * timedelta(hours=int(zone[:2]), minutes=int(zone[2:]))
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class OperationStore(object):
+    """Local sqlite index of wallet operations.
+
+    Operations are keyed by operation_id and indexed by datetime (UTC) and
+    label; queries never touch the API.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript('''
+                CREATE TABLE IF NOT EXISTS operations (
+                    operation_id TEXT PRIMARY KEY,
+                    datetime TEXT NOT NULL,
+                    label TEXT,
+                    direction TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS operations_datetime ON operations (datetime);
+                CREATE INDEX IF NOT EXISTS operations_label ON operations (label, datetime);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            ''')
+
+    def save(self, operations, state=None):
+        """Upsert operations and update sync state in one transaction."""
+        rows = [(operation['operation_id'], to_utc(operation['datetime']),
+                 operation.get('label'), operation.get('direction'), json.dumps(operation))
+                for operation in operations]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO operations VALUES (?, ?, ?, ?, ?)', rows)
+            for key, value in (state or {}).items():
+                if value is None:
+                    self._connection.execute('DELETE FROM sync_state WHERE key = ?', (key,))
+                else:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (key, value))
+
+    def get_state(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def get(self, operation_id):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM operations WHERE operation_id = ?', (operation_id,)).fetchone()
+        return Operation(loads(row[0])) if row is not None else None
+
+    def query(self, label=None, since=None, until=None, direction=None, limit=None):
+        """Operations newest first; ``since`` is inclusive, ``until`` exclusive."""
+        clauses, params = [], []
+        if label is not None:
+            clauses.append('label = ?')
+            params.append(label)
+        if since is not None:
+            clauses.append('datetime >= ?')
+            params.append(to_utc(since))
+        if until is not None:
+            clauses.append('datetime < ?')
+            params.append(to_utc(until))
+        if direction is not None:
+            clauses.append('direction = ?')
+            params.append(direction)
+        sql = 'SELECT data FROM operations'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY datetime DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [Operation(loads(row[0])) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM operations').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class HistorySync(object):
+    """Incrementally mirrors Wallet.operation_history into an OperationStore.
+
+    Each run asks only for operations at or after the last checkpoint (the
+    ``from`` parameter). Every page is committed together with the position
+    of the next one, so an interrupted run resumes where it stopped; the
+    checkpoint moves forward only once a run has completed.
+    """
+
+    def __init__(self, wallet, store, page_size=100, details=False):
+        self.wallet = wallet
+        self.store = store
+        self.page_size = page_size
+        self.details = details
+
+    @property
+    def checkpoint(self):
+        return self.store.get_state('checkpoint')
+
+    def sync(self):
+        """Fetch new operations; returns how many were stored."""
+        run_from = self.store.get_state('run_from')
+        next_record = self.store.get_state('run_next_record')
+        if run_from is None:
+            run_from = self.checkpoint or ''
+            next_record = None
+        newest = self.store.get_state('run_newest') or run_from
+        stored = 0
+        while True:
+            options = {'records': self.page_size}
+            if self.details:
+                options['details'] = 'true'
+            if run_from:
+                options['from'] = run_from
+            if next_record is not None:
+                options['start_record'] = next_record
+            page = self.wallet.operation_history(options)
+            operations = page.get('operations', [])
+            for operation in operations:
+                newest = max(newest, to_utc(operation['datetime']))
+            next_record = page.get('next_record')
+            if next_record is None:
+                self.store.save(operations, {'checkpoint': newest or None,
+                                             'run_from': None,
+                                             'run_next_record': None,
+                                             'run_newest': None})
+                return stored + len(operations)
+            self.store.save(operations, {'run_from': run_from,
+                                         'run_next_record': next_record,
+                                         'run_newest': newest or None})
+            stored += len(operations)
@@ -0,0 +1,66 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+try:
+    from urllib.parse import urlencode
+except ImportError:  # Python 2
+    from urllib import urlencode
+
+from .models import model_for_url
+
+
+__all__ = ['RequestTemplate', 'encode_form', 'BASE_HEADERS']
+
+USER_AGENT = "Yandex.Money.SDK/Python"
+BASE_HEADERS = {"User-Agent": USER_AGENT}
+FORM_HEADERS = {"User-Agent": USER_AGENT,
+                "Content-Type": "application/x-www-form-urlencoded"}
+
+
+def _utf8(value):
+    return value if isinstance(value, bytes) else '{}'.format(value).encode('utf-8')
+
+
+def encode_form(fields, skip=()):
+    """Form-encode ``fields`` like requests does for a dict body.
+
+    None values are dropped, lists and tuples become repeated keys and text
+    is sent as UTF-8. Keys listed in ``skip`` are left out.
+    """
+    pairs = []
+    for key, value in fields.items():
+        if value is None or key in skip:
+            continue
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if item is not None:
+                pairs.append((_utf8(key), _utf8(item)))
+    return urlencode(pairs)
+
+
+class RequestTemplate(object):
+    """A request to one endpoint with everything but the options prepared.
+
+    The full URL, the headers and the form encoding of the constant
+    ``fields`` are built once; ``body(options)`` only encodes the per-call
+    options. Constant fields win over options of the same name. The
+    headers dict is shared by every request and must not be modified.
+    """
+    __slots__ = ('url', 'headers', 'fields', 'model', '_encoded')
+
+    def __init__(self, url, headers=None, fields=None):
+        self.url = url
+        self.headers = dict(FORM_HEADERS, **headers) if headers else FORM_HEADERS
+        self.fields = dict(fields or {})
+        self.model = model_for_url(url)
+        self._encoded = encode_form(self.fields)
+
+    def body(self, options=None):
+        if not options:
+            return self._encoded
+        encoded = encode_form(options, self.fields)
+        if not self._encoded:
+            return encoded
+        return self._encoded + '&' + encoded if encoded else self._encoded
+
+    def __repr__(self):
+        return '<RequestTemplate {} {!r}>'.format(self.url, sorted(self.fields))
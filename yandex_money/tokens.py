@@ -0,0 +1,131 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import atexit
+import threading
+
+from . import exceptions
+from .api import Wallet
+from .storage import get_default_store
+
+
+__all__ = ['TokenManager']
+
+
+class TokenManager(object):
+    """Owns an access token, the aux tokens derived from it and their refresh.
+
+    ``aux_wallet(scope)`` returns a pooled Wallet on an aux token for that
+    scope set, requesting /api/token-aux only once per set. ``call(func)``
+    runs ``func(wallet)``; when requests fail with TokenError, concurrent
+    callers share a single ``refresh(stale_token)`` call and retry once with
+    the new token. ``shutdown()`` revokes pooled aux tokens in batches.
+
+    With a ``store_key`` the current token is kept in ``store`` (by default
+    storage.get_default_store()): managers in other processes start from
+    it and adopt a token refreshed elsewhere instead of refreshing again.
+    """
+
+    def __init__(self, access_token, refresh=None, on_refresh=None,
+                 wallet_class=Wallet, revoke_batch_size=10,
+                 revoke_on_exit=False, store=None, store_key=None,
+                 **wallet_options):
+        self._store = store
+        self.store_key = store_key
+        if store_key is not None:
+            access_token = self.store.get(store_key) or access_token
+        self.refresh_token = refresh
+        self.on_refresh = on_refresh
+        self.wallet_class = wallet_class
+        self.wallet_options = wallet_options
+        self.revoke_batch_size = revoke_batch_size
+        self.wallet = wallet_class(access_token, **wallet_options)
+        self.refreshes = 0
+        self._aux = {}  # frozenset(scope) -> Wallet
+        self._aux_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        if revoke_on_exit:
+            atexit.register(self.shutdown)
+
+    @property
+    def access_token(self):
+        return self.wallet.access_token
+
+    @property
+    def store(self):
+        return self._store if self._store is not None else get_default_store()
+
+    def aux_wallet(self, scope):
+        key = frozenset(scope)
+        wallet = self._aux.get(key)
+        if wallet is not None:
+            return wallet
+        with self._aux_lock:
+            wallet = self._aux.get(key)
+            if wallet is None:
+                token = self.call(lambda wallet: wallet.get_aux_token(sorted(key)))['aux_token']
+                wallet = self._aux[key] = self.wallet_class(token, **self.wallet_options)
+        return wallet
+
+    def aux_token(self, scope):
+        return self.aux_wallet(scope).access_token
+
+    def refresh(self, stale_token):
+        """Replace ``stale_token`` unless another caller already did."""
+        with self._refresh_lock:
+            if self.wallet.access_token != stale_token:
+                return self.wallet.access_token
+            token = self.store.get(self.store_key) if self.store_key is not None else None
+            if token is None or token == stale_token:
+                if self.refresh_token is None:
+                    raise exceptions.TokenError
+                token = self.refresh_token(stale_token)
+                self.refreshes += 1
+                if self.store_key is not None:
+                    self.store.set(self.store_key, token)
+            self.wallet.access_token = token
+            self._aux = {}  # aux tokens die with their parent token
+        if self.on_refresh is not None:
+            self.on_refresh(token)
+        return token
+
+    def call(self, func):
+        token = self.wallet.access_token
+        try:
+            return func(self.wallet)
+        except exceptions.TokenError:
+            self.refresh(token)
+            return func(self.wallet)
+
+    def revoke_aux_tokens(self, wait=True):
+        """Revoke pooled aux tokens, ``revoke_batch_size`` requests at a time."""
+        with self._aux_lock:
+            tokens = [wallet.access_token for wallet in self._aux.values()]
+            self._aux = {}
+        transport = self.wallet.transport
+        errors = []
+
+        def revoke(token):
+            try:
+                self.wallet_class.revoke_token(token, transport=transport)
+            except Exception as error:
+                errors.append(error)
+
+        def run():
+            for start in range(0, len(tokens), self.revoke_batch_size):
+                batch = [threading.Thread(target=revoke, args=(token,))
+                         for token in tokens[start:start + self.revoke_batch_size]]
+                for thread in batch:
+                    thread.start()
+                for thread in batch:
+                    thread.join()
+
+        worker = threading.Thread(target=run)
+        worker.daemon = not wait
+        worker.start()
+        if wait:
+            worker.join()
+        return errors
+
+    def shutdown(self, wait=True):
+        return self.revoke_aux_tokens(wait)
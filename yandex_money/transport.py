@@ -0,0 +1,124 @@
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+
+import threading
+
+
+__all__ = ['Transport', 'RequestsTransport', 'SessionTransport',
+           'get_default_transport', 'set_default_transport', 'DEFAULT_TIMEOUT']
+
+# (connect, read) seconds; a stalled upstream must not block a worker forever
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+def url_path(url):
+    # "scheme://host/api/x" -> "/api/x" without a full urlparse on every call
+    return url[url.find('/', url.find('//') + 2):]
+
+
+class Transport(object):
+    def post(self, url, headers=None, data=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Opens a new connection for every call via module-level requests.post."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def post(self, url, headers=None, data=None):
+        import requests  # deferred until the first request, see get_default_transport
+
+        return requests.post(url, headers=headers, data=data,
+                             timeout=self.timeout)
+
+
+class SessionTransport(Transport):
+    """Keep-alive transport backed by a pooled requests.Session.
+
+    One instance may be shared by any number of Wallet/ExternalPayment
+    objects and threads; connections to each host are reused up to
+    ``pool_maxsize`` at a time. ``timeout`` is passed to requests: seconds
+    or a (connect, read) tuple, None waits forever.
+    """
+
+    def __init__(self, pool_connections=2, pool_maxsize=10, pool_block=False,
+                 max_retries=0, timeout=DEFAULT_TIMEOUT):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _make_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block,
+                              max_retries=self.max_retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._make_session()
+        return self._session
+
+    def post(self, url, headers=None, data=None):
+        return self.session.post(url, headers=headers, data=data,
+                                 timeout=self.timeout)
+
+    def connection_stats(self):
+        """Connections opened and requests sent over the pooled session."""
+        opened = sent = 0
+        if self._session is not None:
+            adapters = set(self._session.adapters.values())
+            for adapter in adapters:
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        opened += pool.num_connections
+                        sent += pool.num_requests
+        return {'connections_opened': opened, 'requests_sent': sent,
+                'connections_reused': max(sent - opened, 0)}
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_default_transport = None  # created on first use so importing the SDK stays cheap
+
+
+def get_default_transport():
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = RequestsTransport()
+    return _default_transport
+
+
+def set_default_transport(transport):
+    global _default_transport
+    _default_transport = transport if transport is not None else RequestsTransport()